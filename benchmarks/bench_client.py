@@ -0,0 +1,53 @@
+"""throughput of Client and AsyncClient over http against FakeNotionServer
+`PYTHONPATH=. python benchmarks/bench_client.py`
+"""
+import asyncio
+import time
+
+from notion_params import AsyncClient, Client
+from notion_params import NotionParams as NP
+from notion_params.fake_server import FakeNotionServer
+
+LATENCY = 0.02
+BLOCKS = 1000
+PAGES = 100
+
+
+def timed(label, func, requests):
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    print(f'{label}: {seconds * 1000:.0f}ms, {requests / seconds:.0f} req/s')
+
+
+def main():
+    with FakeNotionServer(latency=LATENCY) as server:
+        notion = Client(rate_limit=None, base_url=server.url)
+        page = notion.create_page(**NP.create_page(server.root_page_id, title='bench'))
+        for i in range(0, BLOCKS, 100):
+            notion.append_block_children(page['id'], children=NP.md('\n'.join(f'- {j}' for j in range(i, i + 100))))
+        print(f'latency {LATENCY * 1000:.0f}ms per request')
+
+        # pagination, page_size 10 so there are many pages
+        def paginate(client):
+            assert len(list(client.retrieve_block_children(page['id'], page_size=10))) == BLOCKS
+        timed('paginate', lambda: paginate(notion), BLOCKS // 10)
+        timed('paginate prefetch=4', lambda: paginate(Client(rate_limit=None, prefetch=4, base_url=server.url)), BLOCKS // 10)
+
+        def create_pages():
+            for i in range(PAGES):
+                notion.create_page(**NP.create_page(page['id'], title=f'page {i}'))
+        timed('create_page sequential', create_pages, PAGES)
+
+        async def create_pages_async():
+            async with AsyncClient(rate_limit=None, max_connections=20, base_url=server.url) as client:
+                await asyncio.gather(*(
+                    client.create_page(**NP.create_page(page['id'], title=f'page {i}'))
+                    for i in range(PAGES)
+                ))
+        timed('create_page AsyncClient max_connections=20', lambda: asyncio.run(create_pages_async()), PAGES)
+        print(server.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""cold start cost of importing notion_params, each statement runs in a new interpreter
+`PYTHONPATH=. python benchmarks/bench_import.py`
+"""
+import os
+import subprocess
+import sys
+import time
+
+STATEMENTS = [
+    'pass',  # interpreter startup, subtracted from the others
+    'import notion_params',
+    'from notion_params import NotionParams',
+    'from notion_params import Client',
+    'from notion_params import md',
+    'from notion_params import NotionParams as NP; NP.md("# title")',
+]
+
+
+def seconds(statement, repeat=10):
+    env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', statement], check=True, env=env)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    startup = seconds(STATEMENTS[0])
+    print(f'python startup: {startup * 1000:.1f}ms')
+    for statement in STATEMENTS[1:]:
+        print(f'{(seconds(statement) - startup) * 1000:6.1f}ms  {statement}')
+
+
+if __name__ == '__main__':
+    main()
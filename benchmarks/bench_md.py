@@ -0,0 +1,75 @@
+"""per block cost of md() over a markdown corpus like our generated reports
+`PYTHONPATH=. python benchmarks/bench_md.py`
+"""
+import cProfile
+import os
+import pstats
+import sys
+import timeit
+from pathlib import Path
+
+from notion_params import md, md_many
+from notion_params.markdown import _markdown
+
+ROOT = Path(__file__).parent.parent
+
+
+def report(idx):
+    return f"""# Daily report {idx}
+
+!!callout emoji=📈
+Summary of **run {idx}**, see [dashboard](https://example.com/runs/{idx}) for details.
+
+Status <span style='color:green'>passed</span>, latency <span style='background-color:yellow'>*slow*</span> `p99=120ms`.
+
+## Changes
+- fixed `parser` crash on ~~empty~~ blank input
+- improved **throughput** by _12%_
+- <span style='color:red'>regression</span> in [export](https://example.com/export)
+
+1. first step
+1. second step
+
+> quote from the release notes
+>
+>> nested quote
+
+| Metric | Value | Delta |
+| --- | --- | --- |
+| requests | {idx * 10} | +3% |
+| errors | {idx} | -1% |
+
+```python
+def handler(event):
+    return {{'status': 200, 'run': {idx}}}
+```
+
+---
+"""
+
+
+def corpus():
+    return [report(i) for i in range(20)] + [(ROOT / 'README.md').read_text()]
+
+
+def main():
+    texts = corpus()
+    blocks = sum(len(md(i)) for i in texts)
+    seconds = min(timeit.repeat(lambda: [md(i) for i in texts], number=5, repeat=5)) / 5
+    print(f'{len(texts)} documents, {blocks} blocks: {seconds * 1000:.1f}ms, {seconds / blocks * 1e6:.1f}us per block')
+    # renderer only, without marko parsing
+    _md = _markdown()
+    docs = [_md.parse(i) for i in texts]
+    seconds = min(timeit.repeat(lambda: [_md.render(i) for i in docs], number=5, repeat=5)) / 5
+    print(f'render only: {seconds * 1000:.1f}ms, {seconds / blocks * 1e6:.1f}us per block')
+    # all cores, each process converts whole documents
+    seconds = min(timeit.repeat(lambda: list(md_many(texts * 5)), number=1, repeat=3)) / 5
+    print(f'md_many on {os.cpu_count()} cpus: {seconds * 1000:.1f}ms, {seconds / blocks * 1e6:.1f}us per block')
+    if '--profile' in sys.argv:
+        profile = cProfile.Profile()
+        profile.runcall(lambda: [md(i) for i in texts * 5])
+        pstats.Stats(profile).sort_stats('cumulative').print_stats(25)
+
+
+if __name__ == '__main__':
+    main()
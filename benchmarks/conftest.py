@@ -0,0 +1,37 @@
+"""fixtures of the pytest-benchmark suite, see Makefile `bench-save` and `bench-compare`"""
+import pytest
+
+from bench_md import report
+from bench_table_df_rows import get_df
+from notion_params import Client
+from notion_params import NotionParams as NP
+from notion_params.fake_server import FakeNotionServer
+
+
+@pytest.fixture(scope='session')
+def docs():
+    # small: one paragraph, medium: one report, huge: 200 reports, ~135KB
+    return {
+        'small': 'Status <span style=\'color:green\'>passed</span> in **12s**, see [run](https://example.com/runs/1).',
+        'medium': report(1),
+        'huge': ''.join(report(i) for i in range(200)),
+    }
+
+
+@pytest.fixture(scope='session')
+def dataframes():
+    return {
+        'long': get_df(10_000, 5),
+        'wide': get_df(1_000, 50),
+    }
+
+
+@pytest.fixture(scope='session')
+def fake_page():
+    """server without latency, so the client side cost is measured, and a page with 1000 blocks"""
+    with FakeNotionServer() as server:
+        notion = Client(rate_limit=None, base_url=server.url)
+        page = notion.create_page(**NP.create_page(server.root_page_id, title='bench'))
+        for i in range(0, 1000, 100):
+            notion.append_block_children(page['id'], children=NP.md('\n'.join(f'- item {j}' for j in range(i, i + 100))))
+        yield server, page['id']
@@ -0,0 +1,12 @@
+import pytest
+
+from notion_params import Client
+
+
+@pytest.mark.parametrize('prefetch', [0, 4])
+def test_paginate(benchmark, fake_page, prefetch):
+    # Client._paginate through retrieve_block_children, 10 requests of 100 blocks over http
+    server, page_id = fake_page
+    notion = Client(rate_limit=None, prefetch=prefetch, base_url=server.url)
+    blocks = benchmark(lambda: list(notion.retrieve_block_children(page_id)))
+    assert len(blocks) == 1000
@@ -0,0 +1,19 @@
+import pytest
+
+from notion_params import md, md_line
+
+
+@pytest.mark.parametrize('size', ['small', 'medium'])
+def test_md(benchmark, docs, size):
+    blocks = benchmark(md, docs[size])
+    assert blocks
+
+
+def test_md_huge(benchmark, docs):
+    # more than a second per call, a few rounds are enough
+    blocks = benchmark.pedantic(md, args=(docs['huge'],), rounds=3, iterations=1)
+    assert len(blocks) > 4_000
+
+
+def test_md_line(benchmark):
+    assert benchmark(md_line, 'Daily report **12** <span style=\'color:red\'>failed</span>')
@@ -0,0 +1,32 @@
+import pytest
+
+from notion_params import NotionParams as NP
+from notion_params import RowSerializer
+from notion_params.client import make_params
+
+
+@pytest.mark.parametrize('shape', ['long', 'wide'])
+def test_table_df_rows(benchmark, dataframes, shape):
+    df = dataframes[shape]
+    rows = benchmark(NP.table_df_rows, df)
+    assert len(rows) == len(df)
+
+
+def test_create_database_row(benchmark):
+    row = {'name': 'row 1', 'status': 'done', 'owner': 'someone', 'notes': 'text ' * 20}
+    params = benchmark(NP.create_database_row, 'db', row=row, column_types={'status': 'rich_text'})
+    assert params['properties']['name']['type'] == 'title'
+
+
+def test_row_serializer(benchmark, dataframes):
+    df = dataframes['long']
+    serializer = RowSerializer.from_columns(list(df.columns))
+    rows = benchmark(lambda: list(serializer.serialize(df)))
+    assert len(rows) == len(df)
+
+
+def test_make_params(benchmark):
+    def query_database(database_id, *, filter=None, sorts=None, start_cursor=None, page_size=None):
+        return make_params(locals())
+    params = benchmark(query_database, 'db', filter={'property': 'k', 'rich_text': {'equals': 'x'}}, page_size=100)
+    assert params == {'filter': {'property': 'k', 'rich_text': {'equals': 'x'}}, 'page_size': 100}
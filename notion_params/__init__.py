@@ -1,7 +1,55 @@
-from typing import Any, List, Mapping
+import importlib
+from typing import TYPE_CHECKING, Any, List, Mapping
 
-from .markdown import md, md_line
-from .client import Client
+if TYPE_CHECKING:  # pragma: no cover
+    from .async_client import AsyncClient
+    from .bulk import append_blocks, bulk_create_database_rows, upload_table
+    from .cache import FileResponseCache, ResponseCache
+    from .client import Client
+    from .export import blocks_to_md
+    from .markdown import disable_md_cache, enable_md_cache, md, md_iter, md_line, md_many
+    from .metrics import HistogramCollector, Hooks
+    from .rows import DatabaseWriter, RowSerializer
+    from .sync import sync_markdown
+
+# name -> module, imported on first access, so `import notion_params` doesn't import marko, requests etc
+# eg a job only using Client never imports marko
+_LAZY = {
+    'AsyncClient': '.async_client',
+    'append_blocks': '.bulk',
+    'bulk_create_database_rows': '.bulk',
+    'upload_table': '.bulk',
+    'FileResponseCache': '.cache',
+    'ResponseCache': '.cache',
+    'Client': '.client',
+    'blocks_to_md': '.export',
+    'disable_md_cache': '.markdown',
+    'enable_md_cache': '.markdown',
+    'md': '.markdown',
+    'md_iter': '.markdown',
+    'md_line': '.markdown',
+    'md_many': '.markdown',
+    'HistogramCollector': '.metrics',
+    'Hooks': '.metrics',
+    'DatabaseWriter': '.rows',
+    'RowSerializer': '.rows',
+    'sync_markdown': '.sync',
+}
+
+__all__ = ['NotionParams', *_LAZY]
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # next access doesn't call __getattr__
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY})
 
 
 class NotionParams:
@@ -23,11 +71,31 @@ class NotionParams:
     ```
     """
 
-    md = md
-    md_line = md_line
+    # markdown functions, see notion_params.markdown, marko is imported on first call
+
+    @staticmethod
+    def md(text):
+        from .markdown import md
+        return md(text)
+
+    @staticmethod
+    def md_iter(text_or_file):
+        from .markdown import md_iter
+        return md_iter(text_or_file)
+
+    @staticmethod
+    def md_many(texts, workers: int = None, executor: str = 'process', chunksize: int = 1):
+        from .markdown import md_many
+        return md_many(texts, workers=workers, executor=executor, chunksize=chunksize)
+
+    @staticmethod
+    def md_line(text):
+        from .markdown import md_line
+        return md_line(text)
 
     @staticmethod
     def get_client(token=None):
+        from .client import Client
         return Client(token=token)
 
     @staticmethod
@@ -55,11 +123,11 @@ class NotionParams:
                 # when parent.type is "page_id", only valid is title
                 # title can have markdown but displayed as normal text
                 # here use md_line only to format notion text param
-                'title': md_line(title),
+                'title': NotionParams.md_line(title),
             },
         }
         if text:
-            data = md(text)
+            data = NotionParams.md(text)
             # print('markdown', json.dumps(data, indent=4))
             params['children'] = data
         if emoji:
@@ -81,7 +149,7 @@ class NotionParams:
         """
         params = {
             'properties': {
-                'title': md_line(title),
+                'title': NotionParams.md_line(title),
             },
         }
         if emoji:
@@ -94,9 +162,11 @@ class NotionParams:
     def append_markdown(text: str):
         """options in https://developers.notion.com/reference/patch-block-children
         Usage: `client.append_block_children(block_id, **NP.append_markdown('markdown text'))`
+        API accepts at most 100 blocks in one request, for longer text use
+        `append_blocks(client, block_id, **NP.append_markdown('markdown text'))`
         """
         return {
-            'children': md(text),
+            'children': NotionParams.md(text),
         }
 
     @staticmethod
@@ -116,6 +186,8 @@ class NotionParams:
                 block_id=table['id'],
                 children=df[i:i+100]
             )
+        # or let upload_table() create the table and stream rows in batches
+        upload_table(notion, sub_page['id'], df)
         ```
         """
         # https://developers.notion.com/reference/block#table-blocks
@@ -144,7 +216,8 @@ class NotionParams:
 
     @staticmethod
     def table_df_rows(df):
-        """convert all rows to list of blocks, pass in slice if DataFrame too large
+        """convert all rows to list of blocks, pass in slice if DataFrame too large, or see upload_table()
+        :param df: DataFrame, pyarrow Table or list of tuples
         sample
         ```
         notion.blocks.children.append(
@@ -153,23 +226,30 @@ class NotionParams:
         )
         ```
         """
-        return df.apply(
-            lambda row: {
+        if hasattr(df, 'iloc'):
+            # DataFrame, convert column by column instead of DataFrame.apply(axis=1) which builds a Series per row
+            # tolist() gives python objects, so str() is the same as str(row[col]) of each cell
+            rows = zip(*(map(str, df.iloc[:, idx].tolist()) for idx in range(len(df.columns))))
+        elif hasattr(df, 'column_names'):
+            # pyarrow Table
+            rows = zip(*(map(str, df.column(idx).to_pylist()) for idx in range(df.num_columns)))
+        else:
+            # list of tuples
+            rows = (map(str, row) for row in df)
+        return [
+            {
                 "type": "table_row",
                 "table_row": {
                     "cells": [
                         [{
-                            "text": {"content": str(row[col])}
+                            "text": {"content": cell}
                         }]
-                        for col in df.columns
+                        for cell in row
                     ]
                 }
-            } if len(row) else {},
-            # NOTE: if df length is 0, lambda is invoked once with empty row
-            # in this case if reference row[col] will cause confusing error
-            # 'DataFrame' object has no attribute 'tolist'
-            axis=1,
-        ).tolist()
+            }
+            for row in rows
+        ]
 
     @staticmethod
     def df_columns_add_prefix_for_database(df):
@@ -222,7 +302,7 @@ class NotionParams:
                 'type': 'page_id',
                 'page_id': page_id,
             },
-            'title': md_line(title),
+            'title': NotionParams.md_line(title),
             'properties': {
                 column: {column_types[column]: {}}
                 for column in columns
@@ -239,37 +319,17 @@ class NotionParams:
         ```
         for _idx, row in db.iterrows():
             notion.pages.create(**NotionParams.create_database_row(db['id'], row=row))
+        # or for many rows
+        serializer = RowSerializer.from_columns(df.columns)
+        for _idx, row in df.iterrows():
+            notion.pages.create(**serializer.create_database_row(db['id'], row))
         ```
         """
+        from .rows import RowSerializer
         if columns is None:
             columns = row.keys()
-        column_types = {
-            column: (column_types and column_types.get(
-                column) or 'rich_text') if idx else 'title'
-            for idx, column in enumerate(columns)
-        }
-        params = {
-            'parent': {
-                'type': 'database_id',
-                'database_id': db_id
-            },
-            'properties': {
-                column: {
-                    'type': column_types[column],
-                    column_types[column]: row[column] if column_types[column] not in ('title', 'rich_text') else [{
-                        # special value format for title, must be array
-                        'text': {'content': str(row[column])},
-                    }],
-                }
-                for column in columns
-            },
-            # every database row is a page, here it can have children list of blocks
-            # 'children': [{block},...]
-        }
-        if emoji:
-            params['icon'] = {'emoji': emoji}
-        # print('create_database_row', json.dumps(params, indent=4))
-        return params
+        # for many rows, compile once with RowSerializer instead
+        return RowSerializer.from_columns(columns, column_types).create_database_row(db_id, row, emoji=emoji)
 
     @staticmethod
     def find_child(response, *, type_: str, title: str = None):
@@ -0,0 +1,230 @@
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    # optional dependency, `pip install notion-params[async]`
+    httpx = None
+
+from .client import NOTION_BASE_URL, make_headers, make_limiter, make_params
+from .metrics import RequestEvent, emit, make_hooks
+from .ratelimit import NOTION_RATE_LIMIT, AdaptiveConcurrency, RateLimiter, retry_delay
+
+
+class AsyncClient:
+    """asyncio version of Client, same endpoints as async methods and async generators.
+    Requests go through one pooled HTTP/1.1 keep-alive transport (httpx), so many requests can overlap
+    ```
+    async with AsyncClient() as notion:
+        pages = await asyncio.gather(*(
+            notion.create_page(**NP.create_database_row(db_id, row=row))
+            for row in rows
+        ))
+        async for item in notion.query_database(db_id):
+            ...
+    ```
+    :param max_connections: size of the connection pool, also the max requests in flight
+    :param rate_limit: requests per second, None or 0 to disable, see Client
+    :param limiter: a RateLimiter shared with other clients/processes, overrides rate_limit
+    :param concurrency: an AdaptiveConcurrency shared with other clients, see Client
+    :param transport: custom httpx transport, eg httpx.MockTransport in tests
+    :param base_url: API server, eg url of a FakeNotionServer in tests
+    :param hooks: a Hooks or list of them, see Client
+    """
+
+    def __init__(self, token: str = None, *, max_connections: int = 100, timeout: float = 60,
+                 rate_limit: float = NOTION_RATE_LIMIT, limiter: RateLimiter = None,
+                 concurrency: AdaptiveConcurrency = None, transport=None, base_url: str = NOTION_BASE_URL,
+                 hooks=None) -> None:
+        if httpx is None:
+            raise ImportError('AsyncClient requires httpx, install with `pip install notion-params[async]`')
+        self._session = httpx.AsyncClient(
+            base_url=base_url,
+            headers=make_headers(token),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=timeout,
+            transport=transport,
+        )
+        self._limiter = make_limiter(rate_limit, limiter)
+        self._concurrency = concurrency
+        self._hooks = make_hooks(hooks)
+        self._last_exc = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._session.aclose()
+
+    async def _request_core(self, url, **kw):
+        """same as Client._request_core, sleeps without blocking the event loop"""
+        tries = {}  # status_code -> count
+        hooks = self._hooks
+        attempt = 0
+        while True:
+            attempt += 1
+            event = RequestEvent(kw.get('method'), url, attempt) if hooks else None
+            start = time.perf_counter()
+            if self._limiter:
+                delay = self._limiter.reserve()
+                if delay:
+                    await asyncio.sleep(delay)
+            if self._concurrency:
+                await self._concurrency.acquire_async()
+            if event:
+                event.wait = time.perf_counter() - start
+                emit(hooks, 'before', event)
+                start = time.perf_counter()
+            status_code = None
+            try:
+                r = await self._session.request(url=url, **kw)
+                status_code = r.status_code
+            except Exception as exc:
+                if event:
+                    event.error = exc
+                    emit(hooks, 'error', event)
+                raise
+            finally:
+                if self._concurrency:
+                    self._concurrency.release(status_code)
+            if event:
+                event.duration = time.perf_counter() - start
+                event.status = status_code
+                event.bytes_sent = len(r.request.content)
+                event.bytes_received = len(r.content)
+                emit(hooks, 'after', event)
+            try:
+                r.raise_for_status()
+            except httpx.HTTPStatusError as exc:
+                status_code = exc.response.status_code
+                tries[status_code] = tries.get(status_code, 0) + 1
+                delay = retry_delay(status_code, tries[status_code], exc.response.headers.get('Retry-After'))
+                if event:
+                    event.retry_delay = delay
+                    event.error = None if delay is not None else exc
+                    emit(hooks, 'error' if delay is None else 'retry', event)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            return r.json()
+
+    async def _request(self, url, **kw):
+        """save exception for diagnostic, see Client._request"""
+        try:
+            return await self._request_core(url, **kw)
+        except httpx.HTTPStatusError as exc:
+            self._last_exc = exc
+            if str(os.environ.get('NOTION_PARAMS_SHOW_LAST_EXC') or '').lower() in ('yes', 'y', 'true', 't', '1'):
+                self._show_last_exc()
+            raise
+
+    def _show_last_exc(self):
+        exc = self._last_exc
+        if not exc:
+            return
+        print('Response', exc.response.status_code, exc.response.text)
+        print('Request body', exc.request.content)
+
+    async def _api(self, method, url, vars=None):
+        params = make_params(vars) if vars else None
+        return await self._request(url=url, method=method, json=params)
+
+    async def _paginate(self, method, url, vars) -> AsyncIterator[Any]:
+        # https://developers.notion.com/reference/pagination
+        params = make_params(vars)
+        while True:
+            response = await self._request(url=url, method=method, json=params)
+            for item in response.get('results') or []:
+                yield item
+            next_cursor = response.get('next_cursor')
+            if not next_cursor:
+                break
+            params['start_cursor'] = next_cursor
+
+    # same endpoints as Client, in the same order as https://developers.notion.com/reference/intro
+    # paginated endpoints are async generators, use `async for`
+
+    async def query_database(self, database_id, *, filter=None, sorts=None, start_cursor=None, page_size=None) -> AsyncIterator[Any]:
+        """https://developers.notion.com/reference/post-database-query"""
+        async for item in self._paginate('post', f'/v1/databases/{database_id}/query', locals()):
+            yield item
+
+    async def create_database(self, *, parent, properties, title=None, icon=None, cover=None) -> dict:
+        """https://developers.notion.com/reference/create-a-database"""
+        return await self._api('post', '/v1/databases', locals())
+
+    async def update_database(self, database_id, *, title=None, properties=None):
+        """https://developers.notion.com/reference/update-a-database"""
+        return await self._api('patch', f'/v1/databases/{database_id}', locals())
+
+    async def retrieve_database(self, database_id):
+        """https://developers.notion.com/reference/retrieve-a-database"""
+        return await self._api('get', f'/v1/databases/{database_id}')
+
+    async def retrieve_page(self, page_id):
+        """https://developers.notion.com/reference/retrieve-a-page"""
+        return await self._api('get', f'/v1/pages/{page_id}')
+
+    async def create_page(self, *, parent, properties, children=None, icon=None, cover=None):
+        """https://developers.notion.com/reference/post-page"""
+        return await self._api('post', '/v1/pages', locals())
+
+    async def update_page(self, page_id, *, properties=None, archived=None, icon=None, cover=None):
+        """https://developers.notion.com/reference/patch-page"""
+        return await self._api('patch', f'/v1/pages/{page_id}', locals())
+
+    async def retrieve_page_property_item(self, page_id, property_id, *, start_cursor=None, page_size=None):
+        """https://developers.notion.com/reference/retrieve-a-page-property"""
+        async for item in self._paginate('get', f'/v1/pages/{page_id}/properties/{property_id}', locals()):
+            yield item
+
+    async def retrieve_block(self, block_id):
+        """https://developers.notion.com/reference/retrieve-a-block"""
+        return await self._api('get', f'/v1/blocks/{block_id}')
+
+    async def update_block(self, block_id, *, archived=None, **kw):
+        """https://developers.notion.com/reference/update-a-block"""
+        return await self._api('patch', f'/v1/blocks/{block_id}', {**locals(), **kw})
+
+    async def retrieve_block_children(self, block_id, *, start_cursor=None, page_size=None):
+        """https://developers.notion.com/reference/get-block-children"""
+        async for item in self._paginate('get', f'/v1/blocks/{block_id}/children', locals()):
+            yield item
+
+    async def append_block_children(self, block_id, *, children, after=None):
+        """https://developers.notion.com/reference/patch-block-children
+        :param after: id of an existing child, new children are inserted after it, default at the end
+        """
+        return await self._api('patch', f'/v1/blocks/{block_id}/children', locals())
+
+    async def delete_block(self, block_id):
+        """https://developers.notion.com/reference/delete-a-block"""
+        return await self._api('delete', f'/v1/blocks/{block_id}')
+
+    async def retrieve_user(self, user_id):
+        """https://developers.notion.com/reference/get-user"""
+        return await self._api('get', f'/v1/users/{user_id}')
+
+    async def list_users(self, *, start_cursor=None, page_size=None):
+        """https://developers.notion.com/reference/get-users"""
+        async for item in self._paginate('get', '/v1/users', locals()):
+            yield item
+
+    async def retrieve_bot_user(self):
+        """https://developers.notion.com/reference/get-self"""
+        return await self._api('get', '/v1/users/me')
+
+    async def search(self, *, query=None, sort=None, filter=None, start_cursor=None, page_size=None):
+        """https://developers.notion.com/reference/post-search"""
+        async for item in self._paginate('post', '/v1/search', locals()):
+            yield item
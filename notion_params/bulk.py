@@ -0,0 +1,311 @@
+import itertools
+import json
+import os
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Callable, Iterable, List
+
+from .rows import RowSerializer
+
+# https://developers.notion.com/reference/request-limits#limits-for-property-values
+# any array of blocks has at most 100 elements, one request has at most 1000 blocks and 500KB
+MAX_CHILDREN = 100
+MAX_BLOCKS = 1000
+MAX_PAYLOAD_BYTES = 500 * 1000
+
+
+def _split_nested(block, max_children=MAX_CHILDREN):
+    """copy of block with at most 2 levels, children of level 2 and level 2 beyond max_children are removed
+    :returns: (block to send, level 2 blocks beyond max_children, {index of level 2 block: its children})
+    """
+    type_ = block.get('type')
+    children = type_ and (block.get(type_) or {}).get('children')
+    if not children:
+        return block, [], {}
+    kept, extra = children[:max_children], children[max_children:]
+    nested = {}
+    stripped = []
+    for idx, child in enumerate(kept):
+        child_type = child.get('type')
+        grandchildren = child_type and (child.get(child_type) or {}).get('children')
+        if grandchildren:
+            nested[idx] = grandchildren
+            child = {**child, child_type: {k: v for k, v in child[child_type].items() if k != 'children'}}
+        stripped.append(child)
+    return {**block, type_: {**block[type_], 'children': stripped}}, extra, nested
+
+
+def _chunks(children, max_children, max_bytes):
+    """group blocks in order, each group fits in one request"""
+    chunk, chunk_blocks, chunk_bytes = [], 0, 0
+    for block in children:
+        block, extra, nested = _split_nested(block, max_children)
+        type_ = block.get('type')
+        blocks = 1 + len(type_ and (block.get(type_) or {}).get('children') or [])
+        size = len(json.dumps(block)) + 2  # ', ' separator
+        if chunk and (
+            len(chunk) >= max_children
+            or chunk_blocks + blocks > MAX_BLOCKS
+            or chunk_bytes + size > max_bytes
+        ):
+            yield chunk
+            chunk, chunk_blocks, chunk_bytes = [], 0, 0
+        chunk.append((block, extra, nested))
+        chunk_blocks += blocks
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+
+def append_blocks(client, block_id: str, children: Iterable[dict], *, after: str = None,
+                  max_children: int = MAX_CHILDREN, max_bytes: int = MAX_PAYLOAD_BYTES) -> dict:
+    """append any number of blocks, nested any levels deep, in order
+    blocks are sent in requests of at most `max_children` blocks and `max_bytes` json,
+    children deeper than 2 levels are appended in follow-up requests to the created blocks
+    ```
+    append_blocks(notion, page_id, NP.md(long_markdown_text))
+    ```
+    :param after: id of an existing child, blocks are inserted after it, default at the end
+    :returns: same format as `client.append_block_children()`, results of all requests are merged,
+        only first level blocks are in results
+    """
+    results = []
+    for chunk in _chunks(children, max_children, max_bytes):
+        kw = {'after': after} if after else {}  # clients without `after` still work
+        response = client.append_block_children(block_id, children=[block for block, _, _ in chunk], **kw)
+        created = response.get('results') or []
+        results.extend(created)
+        if after and created:
+            # next chunk goes after the last block of this one
+            after = created[-1]['id']
+        for new_block, (_block, extra, nested) in zip(created, chunk):
+            if nested:
+                # append response only has first level, find ids of the 2nd level
+                level2 = list(client.retrieve_block_children(new_block['id']))
+                for idx, grandchildren in nested.items():
+                    append_blocks(client, level2[idx]['id'], grandchildren, max_children=max_children, max_bytes=max_bytes)
+            if extra:
+                append_blocks(client, new_block['id'], extra, max_children=max_children, max_bytes=max_bytes)
+    return {'object': 'list', 'results': results}
+
+
+def _table_row(values):
+    # https://developers.notion.com/reference/block#table-rows
+    return {
+        "type": "table_row",
+        "table_row": {
+            "cells": [
+                [{
+                    "text": {"content": str(value)}
+                }]
+                for value in values
+            ]
+        }
+    }
+
+
+def _is_dataframe(data):
+    return hasattr(data, 'columns') and hasattr(data, 'iloc')
+
+
+def _table_batches(data, columns, batch_size, header=True):
+    """yield (columns, list of table_row blocks), rows are read lazily
+    data can be a DataFrame, an iterable of DataFrames, or an iterable of rows (list, tuple or dict)
+    """
+    from . import NotionParams
+    if _is_dataframe(data):
+        data = [data]
+    rows = iter(data)
+    first = next(rows, None)
+    if first is None:
+        return
+    if _is_dataframe(first):
+        # DataFrame chunks, eg pd.read_csv(path, chunksize=1000)
+        for df in itertools.chain([first], rows):
+            for i in range(0, len(df), batch_size):
+                yield list(df.columns if columns is None else columns), NotionParams.table_df_rows(df[i:i+batch_size])
+        return
+    if columns is None:
+        if isinstance(first, Mapping):
+            columns = list(first.keys())
+        elif header:
+            # header would be the positions, "0", "1", ...
+            raise ValueError('columns is required for rows of list or tuple with has_column_header')
+        else:
+            columns = range(len(first))
+    rows = itertools.chain([first], rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        yield columns, NotionParams.table_df_rows([
+            [row[col] for col in columns] if isinstance(row, Mapping) else row
+            for row in batch
+        ])
+
+
+def upload_table(client, parent_id: str, data, *, columns: List[str] = None,
+                 has_column_header: bool = True, has_row_header: bool = True,
+                 batch_size: int = MAX_CHILDREN, progress: Callable[[int], None] = None) -> dict:
+    """create a table block in parent_id and stream rows to it in batches, memory stays flat for any number of rows
+    ```
+    upload_table(notion, page_id, df)
+    upload_table(notion, page_id, pd.read_csv('big.csv', chunksize=10000), progress=print)
+    upload_table(notion, page_id, cursor.fetchall(), columns=['id', 'name'])  # rows of tuples
+    ```
+    :param data: DataFrame, iterable of DataFrames, or iterable of rows (list, tuple or dict)
+    :param columns: header texts, default columns of DataFrame or keys of dict rows.
+        For dict rows it also selects the values of each row.
+        Required for rows of list or tuple, unless has_column_header is False.
+    :param batch_size: rows per request, at most MAX_CHILDREN
+    :param progress: called with total rows sent after each batch
+    :returns: the created table block, None if data has no rows
+    """
+    if not 0 < batch_size <= MAX_CHILDREN:
+        raise ValueError(f'batch_size must be 1 to {MAX_CHILDREN}')
+    batches = _table_batches(data, columns, batch_size, has_column_header)
+    columns, rows = next(batches, (None, None))
+    if rows is None:
+        return None
+    header = [_table_row(columns)] if has_column_header else []
+    if header and len(rows) == batch_size:
+        # header takes one slot of the first request, send rows separately
+        batches, rows = itertools.chain([(columns, rows)], batches), []
+    table = {
+        'type': 'table',
+        'table': {
+            "table_width": len(columns),
+            "has_column_header": has_column_header,
+            "has_row_header": has_row_header,
+            "children": header + rows,
+        }
+    }
+    table = client.append_block_children(parent_id, children=[table])['results'][0]
+    sent = len(rows)
+    if progress and sent:
+        progress(sent)
+    for _columns, rows in batches:
+        client.append_block_children(table['id'], children=rows)
+        sent += len(rows)
+        if progress:
+            progress(sent)
+    return table
+
+
+def _is_transient(exc, connection_errors=False):
+    """errors worth retrying, 429/502 are already retried by the client
+    connection errors and timeouts only if asked, the page may be created before the connection broke
+    """
+    response = getattr(exc, 'response', None)
+    if response is None:
+        # connection error, timeout etc, requests exceptions are OSError
+        return connection_errors and isinstance(exc, OSError)
+    status_code = getattr(response, 'status_code', 0)
+    return status_code >= 500 and status_code != 502
+
+
+class _Checkpoint:
+    """keys of created rows, one json value per line, appended as soon as each row is created
+    keys holds only rows created by earlier runs, rows of this run are never skipped
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.keys = set()
+        self._lock = threading.Lock()
+        self._file = None
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        self.keys.add(json.loads(line))
+                    except ValueError:
+                        pass  # last line may be broken by a crash
+        if path:
+            self._file = open(path, 'a')
+
+    def add(self, key):
+        with self._lock:
+            if self._file:
+                self._file.write(json.dumps(key) + '\n')
+                self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+def bulk_create_database_rows(client, db_id: str, rows, *, workers: int = 4, key: Callable = None,
+                              checkpoint: str = None, retries: int = 3, progress: Callable[[int], None] = None,
+                              columns: List[str] = None, column_types: Mapping = None, emoji: str = None,
+                              serializer: RowSerializer = None, retry_connection_errors: bool = False) -> int:
+    """create a database page for each row, `workers` rows at a time, resumable with a checkpoint file
+    ```
+    bulk_create_database_rows(notion, db['id'], df, workers=8, checkpoint='import.ckpt')
+    # crashed? run the same again, rows in import.ckpt are skipped
+    ```
+    :param rows: DataFrame or iterable of rows (dict, Series, etc), read lazily
+    :param key: function(row) -> str, unique key of a row for the checkpoint, default position of the row,
+        which needs rows in the same order when resumed
+    :param checkpoint: file path keeping keys of created rows, rows with keys from earlier runs are skipped
+    :param retries: tries per row for 5xx errors, 429/502 are retried by the client
+    :param retry_connection_errors: retry connection errors and timeouts too,
+        a request may create the page before the connection breaks, retrying it can create a duplicate row
+    :param progress: called with number of rows created so far
+    :param columns, column_types, emoji: see NotionParams.create_database_row()
+    :param serializer: RowSerializer to use instead of columns and column_types,
+        eg RowSerializer.from_database(client.retrieve_database(db_id))
+    :returns: number of rows created, rows skipped by checkpoint are not counted
+    when a row fails, no more rows are started, rows in flight are finished and the error is raised
+    """
+    if _is_dataframe(rows):
+        rows = (row for _idx, row in rows.iterrows())
+    done = _Checkpoint(checkpoint)
+
+    def create(row_key, row):
+        params = serializer.create_database_row(db_id, row, emoji=emoji)
+        for attempt in range(1, retries + 1):
+            try:
+                client.create_page(**params)
+                break
+            except Exception as exc:
+                if attempt == retries or not _is_transient(exc, retry_connection_errors):
+                    raise
+                time.sleep(2 ** (attempt - 1))
+        done.add(row_key)
+
+    created = 0
+    error = None
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='notion-params-rows') as pool:
+            pending = set()
+            for idx, row in enumerate(rows):
+                if serializer is None:
+                    # compile once, columns default to keys of the first row
+                    serializer = RowSerializer.from_columns(list(row.keys()) if columns is None else columns, column_types)
+                row_key = idx if key is None else key(row)
+                if row_key in done.keys:
+                    continue
+                if len(pending) >= workers * 2:
+                    # bounded, don't read all rows into the pool queue
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        error = error or future.exception()
+                        created += future.exception() is None
+                    if progress:
+                        progress(created)
+                    if error:
+                        break
+                pending.add(pool.submit(create, row_key, row))
+            for future in as_completed(pending):
+                error = error or future.exception()
+                created += future.exception() is None
+            if progress and pending:
+                progress(created)
+    finally:
+        done.close()
+    if error:
+        raise error
+    return created
@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# retrieve endpoints cached by Client, one id can be a page, a block and a database at the same time
+CACHED_KINDS = ('databases', 'pages', 'blocks', 'users')
+
+
+def cache_key(kind: str, id: str) -> str:
+    """method and path of a retrieve request, ids with and without dashes give the same key"""
+    return f'GET /v1/{kind}/{str(id).replace("-", "").lower()}'
+
+
+class ResponseCache:
+    """TTL + LRU cache of responses of retrieve_database, retrieve_page, retrieve_block and retrieve_user, thread safe
+    entries are dropped after ttl seconds or when the same client updates or deletes the id,
+    changes by other clients or in the Notion UI are seen after ttl at the latest
+    responses are saved as json and every hit returns a new copy, so callers can change them
+    ```
+    notion = Client(cache=ResponseCache(ttl=300))
+    schema = notion.retrieve_database(db_id)  # request
+    schema = notion.retrieve_database(db_id)  # cached
+    notion.update_database(db_id, properties=...)  # drops the cached database
+    ```
+    :param maxsize: max number of responses, least recently used are dropped first
+    :param ttl: seconds a response is used, None to keep until dropped by maxsize or an update
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires, json)
+        self._lock = threading.Lock()
+
+    def _expires(self, now):
+        return float('inf') if self.ttl is None else now + self.ttl
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(entry[1])
+
+    def put(self, key, value):
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = self._expires(time.monotonic()), data
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, id: str):
+        """drop cached responses of id, of any kind"""
+        with self._lock:
+            for kind in CACHED_KINDS:
+                self._entries.pop(cache_key(kind, id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def info(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+        }
+
+
+class FileResponseCache(ResponseCache):
+    """ResponseCache saved in a sqlite file, shared by all runs and processes using the same path
+    use one path per token, responses of one workspace must not be read with the token of another
+    ```
+    notion = Client(cache=FileResponseCache('/tmp/notion-cache.sqlite', ttl=3600))
+    ```
+    """
+
+    def __init__(self, path: str, maxsize: int = 1024, ttl: float = 60) -> None:
+        # imported here, Client imports this module and most clients have no file cache
+        import sqlite3
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.path = path
+        # autocommit, every statement is its own transaction, timeout waits for locks of other processes
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        # a cache can lose the last writes on power loss, no fsync per write
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, data TEXT, expires REAL, used REAL)'
+        )
+
+    def get(self, key):
+        # wall clock because monotonic clock is not comparable between processes
+        now = time.time()
+        with self._lock:
+            row = self._db.execute('SELECT data, expires FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None and row[1] <= now:
+                self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute('UPDATE responses SET used = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)',
+                (key, data, self._expires(now), now),
+            )
+            self._db.execute(
+                'DELETE FROM responses WHERE key IN'
+                ' (SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)',
+                (self.maxsize,),
+            )
+
+    def invalidate(self, id: str):
+        with self._lock:
+            self._db.executemany(
+                'DELETE FROM responses WHERE key = ?',
+                [(cache_key(kind, id),) for kind in CACHED_KINDS],
+            )
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM responses')
+            self.hits = self.misses = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            size = self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': size,
+        }
+
+    def close(self):
+        self._db.close()
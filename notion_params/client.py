@@ -1,11 +1,18 @@
 import json
 import os
-from typing import Any, Iterator
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Iterator, List, Tuple
 from urllib.parse import urljoin
 
-import backoff
 import requests
 
+from .cache import ResponseCache, cache_key
+from .metrics import RequestEvent, body_size, emit, make_hooks
+from .ratelimit import NOTION_RATE_LIMIT, AdaptiveConcurrency, RateLimiter, retry_delay
+
 # https://developers.notion.com/reference/intro#conventions
 NOTION_BASE_URL = 'https://api.notion.com'
 
@@ -41,47 +48,111 @@ def make_params(vars):
     return params
 
 
+def make_headers(token: str = None):
+    """headers for every request, token defaults to env NOTION_TOKEN"""
+    if token is None:
+        token = os.environ.get('NOTION_TOKEN')
+    return {
+        "Accept": "application/json",
+        "Notion-Version": NOTION_VERSION,
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {token}"
+    }
+
+
+def make_limiter(rate_limit, limiter):
+    if limiter is not None:
+        return limiter
+    return RateLimiter(rate_limit) if rate_limit else None
+
+
 class Client:
     """A simple direct translation of offical API reference https://developers.notion.com/reference/intro into api endpoints,
     NotionParams should have a helper for each api to fill-in options, so they can be used as
     ```
     client.append_block_children(block_id, **NP.append_markdown('markdown text'))
     ```
+    Requests are throttled by a client-side token bucket before they are sent, see RateLimiter.
+    :param rate_limit: requests per second, None or 0 to disable
+    :param limiter: a RateLimiter shared with other clients/processes, overrides rate_limit
+    :param concurrency: an AdaptiveConcurrency to limit requests in flight, share it between
+        threads, clients and AsyncClient so all of them back off together on 429/502
+    :param prefetch: read-ahead pages for paginated endpoints (query_database, search, etc)
+        0 to fetch next page only when current page is used up,
+        N > 0 to fetch in a background thread, keep at most N pages ahead of the caller
+    :param base_url: API server, eg url of a FakeNotionServer in tests
+    :param hooks: a Hooks or list of them, called before/after every request, on retry and on error,
+        eg HistogramCollector for latency, retry and throttling metrics
+    :param cache: a ResponseCache of retrieve_database, retrieve_page, retrieve_block and retrieve_user,
+        update_database, update_page, update_block, append_block_children and delete_block drop the cached id,
+        eg FileResponseCache to reuse database schemas between runs
     """
 
-    def __init__(self, token: str = None) -> None:
-        if token is None:
-            token = os.environ.get('NOTION_TOKEN')
+    def __init__(self, token: str = None, *, rate_limit: float = NOTION_RATE_LIMIT, limiter: RateLimiter = None,
+                 concurrency: AdaptiveConcurrency = None, prefetch: int = 0, base_url: str = NOTION_BASE_URL,
+                 hooks=None, cache: ResponseCache = None) -> None:
+        self._base_url = base_url
+        self._cache = cache
+        self._hooks = make_hooks(hooks)
         self._session = requests.Session()
-        self._session.headers.update({
-            "Accept": "application/json",
-            "Notion-Version": NOTION_VERSION,
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {token}"
-        })
+        self._session.headers.update(make_headers(token))
+        self._limiter = make_limiter(rate_limit, limiter)
+        self._concurrency = concurrency
+        self._prefetch = prefetch
         self._last_exc = None
 
-    @backoff.on_exception(
-        # retry 429 until succ or other error
-        backoff.expo,
-        requests.exceptions.HTTPError,
-        giveup=lambda exc: exc.response is not None and exc.response.status_code != 429,
-        max_value=10,
-        jitter=None,
-    )
-    @backoff.on_exception(
-        # retry 502 3 times
-        backoff.constant,
-        requests.exceptions.HTTPError,
-        giveup=lambda exc: exc.response is not None and exc.response.status_code != 502,
-        max_tries=3,
-        interval=2,  # 2 seconds
-        jitter=None,
-    )
     def _request_core(self, url, **kw):
-        r = self._session.request(url=urljoin(NOTION_BASE_URL, url), **kw)
-        r.raise_for_status()
-        return r.json()
+        """send with rate limit and concurrency control, retry 429/502 see retry_delay()"""
+        tries = {}  # status_code -> count
+        hooks = self._hooks
+        attempt = 0
+        while True:
+            attempt += 1
+            event = RequestEvent(kw.get('method'), url, attempt) if hooks else None
+            start = time.perf_counter()
+            if self._limiter:
+                self._limiter.acquire()
+            if self._concurrency:
+                self._concurrency.acquire()
+            if event:
+                event.wait = time.perf_counter() - start
+                emit(hooks, 'before', event)
+                start = time.perf_counter()
+            status_code = None
+            try:
+                r = self._session.request(url=urljoin(self._base_url, url), **kw)
+                status_code = r.status_code
+            except Exception as exc:
+                if event:
+                    event.error = exc
+                    emit(hooks, 'error', event)
+                raise
+            finally:
+                if self._concurrency:
+                    self._concurrency.release(status_code)
+            if event:
+                event.duration = time.perf_counter() - start
+                event.status = status_code
+                event.bytes_sent = body_size(r.request.body if r.request is not None else None)
+                event.bytes_received = len(r.content)
+                emit(hooks, 'after', event)
+            try:
+                r.raise_for_status()
+            except requests.exceptions.HTTPError as exc:
+                if exc.response is None:
+                    raise
+                status_code = exc.response.status_code
+                tries[status_code] = tries.get(status_code, 0) + 1
+                delay = retry_delay(status_code, tries[status_code], exc.response.headers.get('Retry-After'))
+                if event:
+                    event.retry_delay = delay
+                    event.error = None if delay is not None else exc
+                    emit(hooks, 'error' if delay is None else 'retry', event)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            return r.json()
 
     def _request(self, url, **kw):
         """save exception for diagnostic"""
@@ -106,10 +177,29 @@ class Client:
         params = make_params(vars) if vars else None
         return self._request(url=url, method=method, json=params)
 
+    def _retrieve(self, kind, id):
+        cache = self._cache
+        if cache is None:
+            return self._api('get', f'/v1/{kind}/{id}')
+        key = cache_key(kind, id)
+        result = cache.get(key)
+        if result is None:
+            result = self._api('get', f'/v1/{kind}/{id}')
+            cache.put(key, result)
+        return result
+
+    def invalidate_cache(self, id):
+        """drop cached responses of id, eg after it was changed by another client, no-op without cache"""
+        if self._cache is not None:
+            self._cache.invalidate(id)
+
     def _paginate(self, method, url, vars) -> Iterator[Any]:
         # https://developers.notion.com/reference/pagination
         """kw['json'] can have start_cursor, page_size, see sample query_database()"""
         params = make_params(vars)
+        if self._prefetch:
+            yield from self._paginate_prefetch(method, url, params)
+            return
         while True:
             response = self._request(url=url, method=method, json=params)
             yield from response.get('results') or []
@@ -118,6 +208,50 @@ class Client:
                 break
             params['start_cursor'] = next_cursor
 
+    def _paginate_prefetch(self, method, url, params) -> Iterator[Any]:
+        """same as _paginate, next pages are fetched in a background thread while current page is yielded
+        buffer is bounded by self._prefetch pages. When the generator is closed early, eg
+        `islice(notion.list_users(), 3)`, the thread stops after the request in flight.
+        """
+        pages = queue.Queue(maxsize=self._prefetch)
+        stop = threading.Event()
+
+        def put(item):
+            # returns False if the consumer is gone
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def fetch():
+            try:
+                while not stop.is_set():
+                    response = self._request(url=url, method=method, json=params)
+                    if not put((response, None)):
+                        return
+                    next_cursor = response.get('next_cursor')
+                    if not next_cursor:
+                        break
+                    params['start_cursor'] = next_cursor
+                put((None, None))  # done
+            except Exception as exc:
+                put((None, exc))
+
+        threading.Thread(target=fetch, name='notion-params-prefetch', daemon=True).start()
+        try:
+            while True:
+                response, exc = pages.get()
+                if exc is not None:
+                    raise exc
+                if response is None:
+                    break
+                yield from response.get('results') or []
+        finally:
+            stop.set()
+
     # the following 'api' endpoints are simple mirror of https://developers.notion.com/reference/intro
     # in the same order and naming conventions for easier jump to official documents
 
@@ -132,15 +266,18 @@ class Client:
 
     def update_database(self, database_id, *, title=None, properties=None):
         """https://developers.notion.com/reference/update-a-database"""
-        return self._api('patch', f'/v1/databases/{database_id}', locals())
+        try:
+            return self._api('patch', f'/v1/databases/{database_id}', locals())
+        finally:
+            self.invalidate_cache(database_id)
 
     def retrieve_database(self, database_id, ):
         """https://developers.notion.com/reference/retrieve-a-database"""
-        return self._api('get', f'/v1/databases/{database_id}')
+        return self._retrieve('databases', database_id)
 
     def retrieve_page(self, page_id):
         """https://developers.notion.com/reference/retrieve-a-page"""
-        return self._api('get', f'/v1/pages/{page_id}')
+        return self._retrieve('pages', page_id)
 
     def create_page(self, *, parent, properties, children=None, icon=None, cover=None):
         """https://developers.notion.com/reference/post-page"""
@@ -148,7 +285,10 @@ class Client:
 
     def update_page(self, page_id, *, properties=None, archived=None, icon=None, cover=None):
         """https://developers.notion.com/reference/patch-page"""
-        return self._api('patch', f'/v1/pages/{page_id}', locals())
+        try:
+            return self._api('patch', f'/v1/pages/{page_id}', locals())
+        finally:
+            self.invalidate_cache(page_id)
 
     def retrieve_page_property_item(self, page_id, property_id, *, start_cursor=None, page_size=None):
         """https://developers.notion.com/reference/retrieve-a-page-property"""
@@ -156,29 +296,40 @@ class Client:
 
     def retrieve_block(self, block_id):
         """https://developers.notion.com/reference/retrieve-a-block"""
-        return self._api('get', f'/v1/blocks/{block_id}')
+        return self._retrieve('blocks', block_id)
 
     def update_block(self, block_id, *, archived=None, **kw):
         """https://developers.notion.com/reference/update-a-block
         (kw is) the block object type value with the properties to be updated. Currently only text (for supported block types) and checked (for to_do blocks) fields can be updated.
         """
-        return self._api('patch', f'/v1/blocks/{block_id}', {**locals(), **kw})
+        try:
+            return self._api('patch', f'/v1/blocks/{block_id}', {**locals(), **kw})
+        finally:
+            self.invalidate_cache(block_id)
 
     def retrieve_block_children(self, block_id, *, start_cursor=None, page_size=None):
         """https://developers.notion.com/reference/get-block-children"""
         yield from self._paginate('get', f'/v1/blocks/{block_id}/children', locals())
 
-    def append_block_children(self, block_id, *, children):
-        """https://developers.notion.com/reference/patch-block-children"""
-        return self._api('patch', f'/v1/blocks/{block_id}/children', locals())
+    def append_block_children(self, block_id, *, children, after=None):
+        """https://developers.notion.com/reference/patch-block-children
+        :param after: id of an existing child, new children are inserted after it, default at the end
+        """
+        try:
+            return self._api('patch', f'/v1/blocks/{block_id}/children', locals())
+        finally:
+            self.invalidate_cache(block_id)
 
     def delete_block(self, block_id):
         """https://developers.notion.com/reference/delete-a-block"""
-        return self._api('delete', f'/v1/blocks/{block_id}')
+        try:
+            return self._api('delete', f'/v1/blocks/{block_id}')
+        finally:
+            self.invalidate_cache(block_id)
 
     def retrieve_user(self, user_id):
         """https://developers.notion.com/reference/get-user"""
-        return self._api('get', f'/v1/users/{user_id}')
+        return self._retrieve('users', user_id)
 
     def list_users(self, *, start_cursor=None, page_size=None):
         """https://developers.notion.com/reference/get-users"""
@@ -191,3 +342,50 @@ class Client:
     def search(self, *, query=None, sort=None, filter=None, start_cursor=None, page_size=None):
         """https://developers.notion.com/reference/post-search"""
         yield from self._paginate('post', '/v1/search', locals())
+
+    # the following helpers are built on top of the api endpoints above
+
+    def iter_block_tree(self, block_id, *, max_depth: int = None, workers: int = 4) -> Iterator[Tuple[int, str, dict]]:
+        """walk all descendants of a block/page breadth-first
+        children of up to `workers` blocks are fetched at the same time, requests still go through the rate limiter
+        :param max_depth: 1 for direct children only, None for unlimited
+        :returns: iterator of (depth, parent_id, block), children of a block come after the block itself
+        ```
+        for depth, parent_id, block in notion.iter_block_tree(page_id, workers=8):
+            print('  ' * depth, block['type'])
+        ```
+        """
+        def fetch(depth, parent_id):
+            return depth, parent_id, list(self.retrieve_block_children(parent_id))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='notion-params-tree') as pool:
+            pending = {pool.submit(fetch, 1, block_id)}
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        depth, parent_id, blocks = future.result()
+                        for block in blocks:
+                            yield depth, parent_id, block
+                            if block.get('has_children') and (max_depth is None or depth < max_depth):
+                                pending.add(pool.submit(fetch, depth + 1, block['id']))
+            finally:
+                # caller stopped early or error, don't start queued fetches
+                for future in pending:
+                    future.cancel()
+
+    def retrieve_block_tree(self, block_id, *, max_depth: int = None, workers: int = 4) -> List[dict]:
+        """fetch all descendants of a block/page, see iter_block_tree()
+        :returns: list of child blocks, each block's children are in block[block['type']]['children']
+            same as the format to create blocks
+        """
+        roots = []
+        blocks = {}
+        for _depth, parent_id, block in self.iter_block_tree(block_id, max_depth=max_depth, workers=workers):
+            blocks[block['id']] = block
+            if parent_id == block_id:
+                roots.append(block)
+            else:
+                parent = blocks[parent_id]
+                parent.setdefault(parent['type'], {}).setdefault('children', []).append(block)
+        return roots
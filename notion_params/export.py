@@ -0,0 +1,251 @@
+import io
+import re
+from typing import IO, Iterable
+
+# markdown syntax in text, escaped with backslash, see https://spec.commonmark.org/0.30/#backslash-escapes
+_ESCAPE = re.compile(r'[\\`*_\[\]<>~|&]')
+# line starts that would be read as a block, eg "- " list, "# " heading, "!!" custom block of md()
+# * > are escaped anywhere, markup written by _format() never starts with the characters here
+_LINE_START = re.compile(r'^( {0,3})(?:([-+#=]|!(?=!))|(\d{1,9})([.)]))', re.M)
+
+# blocks that are a markdown paragraph, a text line right after them continues the paragraph
+_PARAGRAPHS = ('paragraph', 'callout', 'to_do', 'toggle')
+_LISTS = ('bulleted_list_item', 'numbered_list_item')
+# children are nested in markdown with the prefix, children of other blocks follow them
+_NESTED_PREFIX = {
+    'bulleted_list_item': '  ',
+    'numbered_list_item': '   ',
+    'quote': '> ',
+}
+
+
+def _escape(text):
+    return _ESCAPE.sub(r'\\\g<0>', text)
+
+
+def _escape_line_start(text):
+    return _LINE_START.sub(lambda m: f'{m.group(1)}\\{m.group(2)}' if m.group(2) else f'{m.group(1)}{m.group(3)}\\{m.group(4)}', text)
+
+
+def _code_span(text):
+    # fence longer than any backtick run inside, see https://spec.commonmark.org/0.30/#code-spans
+    fence = '`' * (max(map(len, re.findall('`+', text)), default=0) + 1)
+    if text.startswith('`') or text.endswith('`'):
+        text = f' {text} '
+    return f'{fence}{text}{fence}'
+
+
+def _text_parts(rich_text):
+    """(content, annotations, url) of rich text objects, neighbours with the same format are merged
+    rich text objects can be from md() or from the API, which has default annotations and plain_text
+    """
+    merged = None
+    for item in rich_text or ():
+        if 'type' in item and item['type'] == 'image':
+            # md() keeps an image in rich_text
+            if merged:
+                yield merged
+                merged = None
+            yield _image(item), None, None
+            continue
+        text = item.get('text')
+        if text is not None:
+            content = text.get('content') or ''
+            url = (text.get('link') or {}).get('url')
+        else:
+            # mention, equation
+            content = item.get('plain_text') or ''
+            url = item.get('href')
+        annotations = tuple(sorted(
+            (k, v)
+            for k, v in (item.get('annotations') or {}).items()
+            if v and v != 'default'
+        ))
+        if merged and merged[1] == annotations and merged[2] == url:
+            merged = merged[0] + content, annotations, url
+            continue
+        if merged:
+            yield merged
+        merged = content, annotations, url
+    if merged:
+        yield merged
+
+
+def _format(content, annotations, url):
+    if annotations is None:
+        return content  # image, already markdown, see _text_parts()
+    core = content.strip()
+    if not core:
+        return content
+    # emphasis can't start or end with whitespace, eg "** x**" is not bold
+    lead = content[:len(content) - len(content.lstrip())]
+    trail = content[len(content.rstrip()):]
+    annotations = dict(annotations)
+    text = _code_span(core) if annotations.get('code') else _escape(core)
+    if annotations.get('strikethrough'):
+        text = f'~~{text}~~'
+    if annotations.get('italic'):
+        text = f'*{text}*'
+    if annotations.get('bold'):
+        text = f'**{text}**'
+    if url:
+        text = f'[{text}]({_url(url)})'
+    text = lead + text + trail
+    color = annotations.get('color')
+    if color:
+        # same format as md() reads, see decode_style()
+        if color.endswith('_background'):
+            text = f"<span style='background-color:{color[:-len('_background')]}'>{text}</span>"
+        else:
+            text = f"<span style='color:{color}'>{text}</span>"
+    return text
+
+
+def _url(url):
+    return f'<{url}>' if re.search(r'[\s()<>]', url) else url
+
+
+def _image(block):
+    image = block['image']
+    source = image.get(image.get('type') or 'external')
+    url = source.get('url') if isinstance(source, dict) else source
+    caption = ''.join(content for content, _, _ in _text_parts(image.get('caption')))
+    return f'![{_escape(caption)}]({_url(url or "")})'
+
+
+def rich_text_md(rich_text) -> str:
+    """markdown of a rich text array, reverse of md_line()"""
+    return _escape_line_start(''.join(_format(*part) for part in _text_parts(rich_text)))
+
+
+def _is_blank(block):
+    if block.get('type') != 'paragraph':
+        return False
+    return not any(content for content, _, _ in _text_parts(block['paragraph'].get('rich_text')))
+
+
+def _needs_blank_line(previous, type_):
+    """blank line between blocks that markdown would merge, eg two paragraphs
+    md() emits a blank paragraph for each blank line, those are written as is
+    """
+    if previous is None or previous == 'blank' or type_ == 'blank':
+        return False
+    if previous == 'table':
+        return True
+    if previous in _PARAGRAPHS or previous in _LISTS:
+        return type_ in _PARAGRAPHS or type_ in ('table', 'divider')
+    if previous == 'quote':
+        return type_ in _PARAGRAPHS or type_ in ('quote', 'table', 'divider')
+    return False
+
+
+def _children(block, client):
+    type_ = block.get('type')
+    children = (block.get(type_) or {}).get('children')
+    if children is None and block.get('has_children') and client is not None:
+        # API response, children are fetched page by page while written
+        children = client.retrieve_block_children(block['id'])
+    return children or ()
+
+
+def _block_lines(block, type_, client):
+    """markdown of one block without children, lines end with newline"""
+    body = block.get(type_) or {}
+    text = rich_text_md(body.get('rich_text'))
+    if type_ == 'blank':
+        yield '\n'
+    elif type_ == 'paragraph':
+        yield text + '\n'
+    elif type_.startswith('heading_'):
+        yield f'{"#" * int(type_[-1])} {text.replace(chr(10), " ")}\n'
+    elif type_ in _LISTS:
+        marker = '- ' if type_ == 'bulleted_list_item' else '1. '
+        yield marker + text.replace('\n', '\n' + ' ' * len(marker)) + '\n'
+    elif type_ == 'quote':
+        yield '> ' + text.replace('\n', '\n> ') + '\n'
+    elif type_ in ('callout', 'to_do', 'toggle'):
+        # custom blocks of md(), eg "!!callout emoji=💡 color=gray_background"
+        args = ['todo' if type_ == 'to_do' else type_]
+        emoji = (body.get('icon') or {}).get('emoji')
+        if emoji:
+            args.append(f'emoji={emoji}')
+        if body.get('color') and body['color'] != 'default':
+            args.append(f'color={body["color"]}')
+        if body.get('checked'):
+            args.append('checked=true')
+        yield f'!!{" ".join(args)}\n'
+        yield text + '\n'
+    elif type_ == 'code':
+        content = ''.join(content for content, _, _ in _text_parts(body.get('rich_text')))
+        if content and not content.endswith('\n'):
+            content += '\n'
+        fence = '`' * max(3, max(map(len, re.findall('^ *(`+)', content, re.M)), default=0) + 1)
+        language = body.get('language') or ''
+        yield f'{fence}{"" if language == "plain text" else language}\n'
+        if content:
+            yield content
+        yield f'{fence}\n'
+    elif type_ == 'divider':
+        yield '---\n'
+    elif type_ == 'image':
+        yield _image(block) + '\n'
+    elif type_ == 'table':
+        for idx, row in enumerate(_children(block, client)):
+            # md() reads a cell as plain text, formats are not written, line starts need no escape in a cell
+            cells = [
+                _escape(''.join(content for content, _, _ in _text_parts(cell)).replace('\n', ' '))
+                for cell in row['table_row']['cells']
+            ]
+            yield f'| {" | ".join(cells)} |\n'
+            if idx == 0:
+                yield f'|{"|".join(" --- " for _ in cells)}|\n'
+    elif text:
+        # other blocks with text, eg template, synced_block content is in children
+        yield text + '\n'
+
+
+def _iter_md(blocks, client, prefix='', previous=None):
+    """lines of markdown, returns type of the last block written"""
+    for block in blocks:
+        type_ = 'blank' if _is_blank(block) else block.get('type') or ''
+        if _needs_blank_line(previous, type_):
+            yield prefix.rstrip() + '\n'
+        for chunk in _block_lines(block, type_, client):
+            # every chunk ends with newline, text can have more lines
+            for line in chunk[:-1].split('\n'):
+                yield (prefix + line if line else prefix.rstrip()) + '\n'
+        previous = type_
+        if type_ == 'table':
+            continue
+        children = _children(block, client)
+        if type_ in _NESTED_PREFIX:
+            yield from _iter_md(children, client, prefix + _NESTED_PREFIX[type_], previous)
+        else:
+            # no markdown for children of toggle etc, they follow the block
+            previous = yield from _iter_md(children, client, prefix, previous)
+    return previous
+
+
+def blocks_to_md(blocks: Iterable[dict], out: IO[str] = None, *, client=None):
+    """markdown of blocks, reverse of md(), md(blocks_to_md(md(text))) gives blocks with the same text and formats,
+    text objects may be split differently, eg escaped "a\\_b" is read by md() as "a", "_", "b"
+    custom blocks are written in the same format md() reads, eg "!!callout emoji=💡", and colors as <span style>
+    blocks are written one by one as they are read, so a page of any size is exported in constant memory
+    ```
+    with open('backup.md', 'w') as f:
+        blocks_to_md(notion.retrieve_block_children(page_id), f, client=notion)
+    text = blocks_to_md(NP.md(text))
+    ```
+    :param blocks: iterable of blocks, eg client.retrieve_block_children() or md(),
+        children nested in block[type]['children'] are written too, see Client.retrieve_block_tree()
+    :param out: file-like object to write to, default return the markdown text
+    :param client: Client to fetch children of blocks with has_children, children are not fetched without it
+    Note: markdown has no nesting for children of toggle, callout etc, they are written after the block
+    """
+    if out is None:
+        out = io.StringIO()
+        blocks_to_md(blocks, out, client=client)
+        return out.getvalue()
+    for line in _iter_md(blocks, client):
+        out.write(line)
+    return None
@@ -0,0 +1,525 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# https://developers.notion.com/reference/request-limits
+MAX_PAGE_SIZE = 100
+MAX_CHILDREN = 100
+
+
+class NotionError(Exception):
+    """error response, https://developers.notion.com/reference/errors"""
+
+    def __init__(self, status, code, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.headers = headers or {}
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def _plain_text(rich_text):
+    return ''.join((i.get('text') or {}).get('content') or i.get('plain_text') or '' for i in rich_text or ())
+
+
+def _rich_text(rich_text):
+    """rich text objects in API format, with type, plain_text and default annotations"""
+    return [
+        {
+            'type': 'text',
+            'text': {'content': (i.get('text') or {}).get('content') or '', 'link': (i.get('text') or {}).get('link')},
+            'annotations': {
+                'bold': False, 'italic': False, 'strikethrough': False, 'underline': False, 'code': False,
+                'color': 'default', **(i.get('annotations') or {}),
+            },
+            'plain_text': (i.get('text') or {}).get('content') or '',
+            'href': ((i.get('text') or {}).get('link') or {}).get('url'),
+        }
+        for i in rich_text or ()
+    ]
+
+
+def _property(name, value):
+    """page property value with id and type, value can be short, eg {'title': [rich text]}"""
+    if isinstance(value, list):
+        # only title can be a bare array
+        value = {'title': value}
+    type_ = value.get('type') or next(k for k in value if k != 'id')
+    return {**value, 'id': name, 'type': type_}
+
+
+class FakeNotionStore:
+    """in-memory pages, databases, blocks and users, thread safe"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.objects = {}  # id -> page, database or block
+        self.children = {}  # parent id -> [block id]
+        self.users = {}
+        bot = self.add_user({'type': 'bot', 'name': 'fake bot', 'bot': {}})
+        self.bot_id = bot['id']
+
+    def add_user(self, user):
+        user = {'object': 'user', 'id': str(uuid.uuid4()), **user}
+        self.users[user['id']] = user
+        return user
+
+    def get(self, id, object=None):
+        obj = self.objects.get(id)
+        if obj is None or (object and obj['object'] != object):
+            raise NotionError(404, 'object_not_found', f'Could not find {object or "object"} with ID: {id}.')
+        return obj
+
+    def _new(self, object, parent, **fields):
+        now = _now()
+        obj = {
+            'object': object,
+            'id': str(uuid.uuid4()),
+            'created_time': now,
+            'last_edited_time': now,
+            'archived': False,
+            'parent': parent,
+            **fields,
+        }
+        self.objects[obj['id']] = obj
+        return obj
+
+    def create_page(self, body):
+        parent = body.get('parent') or {}
+        parent_id = parent.get('page_id') or parent.get('database_id')
+        properties = {
+            name: _property(name, value)
+            for name, value in (body.get('properties') or {}).items()
+        }
+        if parent_id:
+            database = self.get(parent_id)
+            if database['object'] == 'database':
+                properties = self._row_properties(database, properties)
+        page = self._new('page', parent, properties=properties, icon=body.get('icon'), cover=body.get('cover'))
+        page['url'] = f'https://www.notion.so/{page["id"].replace("-", "")}'
+        self.children[page['id']] = []
+        if body.get('children'):
+            self.append_children(page['id'], body['children'])
+        return page
+
+    @staticmethod
+    def _row_properties(database, properties):
+        """properties of a database row by name, keys can be names or ids, types must match the schema"""
+        by_id = {prop['id']: prop for prop in database['properties'].values()}
+        checked = {}
+        for key, value in properties.items():
+            prop = database['properties'].get(key) or by_id.get(key)
+            if prop is None:
+                raise NotionError(400, 'validation_error', f'{key} is not a property that exists.')
+            if value['type'] != prop['type']:
+                raise NotionError(400, 'validation_error', f'{prop["name"]} is expected to be {prop["type"]}.')
+            checked[prop['name']] = {**value, 'id': prop['id']}
+        return checked
+
+    def update(self, obj, body):
+        for key, value in body.items():
+            if key == 'properties':
+                obj['properties'].update({
+                    name: _property(name, prop)
+                    for name, prop in value.items()
+                })
+            else:
+                obj[key] = value
+        obj['last_edited_time'] = _now()
+        return obj
+
+    def create_database(self, body):
+        parent = body.get('parent') or {}
+        self.get(parent.get('page_id'), 'page')
+        properties = {
+            name: {'id': name, 'name': name, 'type': type_, type_: value}
+            for name, prop in body['properties'].items()
+            for type_, value in prop.items()
+        }
+        return self._new('database', parent, title=body.get('title') or [], properties=properties,
+                         icon=body.get('icon'), cover=body.get('cover'))
+
+    def update_database(self, database, body):
+        if 'title' in body:
+            database['title'] = body['title']
+        for name, prop in (body.get('properties') or {}).items():
+            if prop is None:
+                database['properties'].pop(name, None)
+                continue
+            for type_, value in prop.items():
+                database['properties'][name] = {'id': name, 'name': name, 'type': type_, type_: value}
+        return database
+
+    def _create_block(self, parent_id, block, level):
+        type_ = block.get('type') or next(k for k in block if k not in ('object', 'type'))
+        body = dict(block[type_])
+        children = body.pop('children', None) or []
+        if len(children) > MAX_CHILDREN:
+            raise NotionError(400, 'validation_error', f'body.children.length should be ≤ `{MAX_CHILDREN}`')
+        if children and level >= 2:
+            raise NotionError(400, 'validation_error', 'children can be nested at most 2 levels deep')
+        if 'rich_text' in body:
+            body['rich_text'] = _rich_text(body['rich_text'])
+        parent_type = 'page_id' if self.objects[parent_id]['object'] == 'page' else 'block_id'
+        new_block = self._new('block', {'type': parent_type, parent_type: parent_id},
+                              type=type_, has_children=bool(children), **{type_: body})
+        self.children[new_block['id']] = [self._create_block(new_block['id'], i, level + 1)['id'] for i in children]
+        return new_block
+
+    def append_children(self, block_id, children, after=None):
+        self.get(block_id)
+        if len(children) > MAX_CHILDREN:
+            raise NotionError(400, 'validation_error', f'body.children.length should be ≤ `{MAX_CHILDREN}`')
+        created = [self._create_block(block_id, block, 1) for block in children]
+        ids = self.children.setdefault(block_id, [])
+        idx = len(ids) if after is None else ids.index(after) + 1
+        ids[idx:idx] = [i['id'] for i in created]
+        parent = self.objects[block_id]
+        if parent['object'] == 'block':
+            parent['has_children'] = bool(ids)
+        return created
+
+    def delete_block(self, block_id):
+        block = self.get(block_id, 'block')
+        block['archived'] = True
+        parent_id = block['parent'].get('page_id') or block['parent'].get('block_id')
+        siblings = self.children.get(parent_id) or []
+        if block_id in siblings:
+            siblings.remove(block_id)
+        parent = self.objects.get(parent_id)
+        if parent and parent['object'] == 'block':
+            parent['has_children'] = bool(siblings)
+        return block
+
+    def update_block(self, block, body):
+        if body.get('archived'):
+            return self.delete_block(block['id'])
+        type_ = block['type']
+        if type_ in body:
+            value = dict(body[type_])
+            if 'rich_text' in value:
+                value['rich_text'] = _rich_text(value['rich_text'])
+            block[type_] = {**block[type_], **value}
+        block['last_edited_time'] = _now()
+        return block
+
+    def title(self, obj):
+        if obj['object'] == 'database':
+            return _plain_text(obj.get('title'))
+        return next((
+            _plain_text(prop.get('title'))
+            for prop in obj['properties'].values()
+            if prop['type'] == 'title'
+        ), '')
+
+
+class FakeNotionServer:
+    """in-process Notion API stand-in, for tests and benchmarks of Client and AsyncClient over real http
+    the endpoints of Client are served from memory, with cursor pagination, latency and injected errors
+    ```
+    with FakeNotionServer(latency=0.05, rate_limit=3) as server:
+        notion = Client('token', base_url=server.url)
+        page = notion.create_page(parent={'page_id': server.root_page_id}, properties={})
+        server.inject(502)  # next request fails once
+        print(server.stats())
+    ```
+    :param latency: seconds every response is delayed, same for all connections
+    :param rate_limit: requests per second, beyond that 429 with Retry-After, None to disable
+    :param burst: requests that can be sent at once, default same as rate_limit
+    :param error_rate: probability of a random 502 for each request
+    :param seed: seed of error_rate
+    :param port: 0 for any free port
+    """
+
+    def __init__(self, *, latency: float = 0.0, rate_limit: float = None, burst: float = None,
+                 error_rate: float = 0.0, seed: int = None, host: str = '127.0.0.1', port: int = 0) -> None:
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.burst = burst or rate_limit
+        self.error_rate = error_rate
+        self.store = FakeNotionStore()
+        root = self.store._new('page', {'type': 'workspace', 'workspace': True}, properties={
+            'title': {'id': 'title', 'type': 'title', 'title': _rich_text([{'text': {'content': 'root'}}])},
+        })
+        self.store.children[root['id']] = []
+        self.root_page_id = root['id']
+        self.requests = []  # (method, path, status)
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._random = random.Random(seed)
+        self._faults = deque()  # (status, retry_after)
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeNotionServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, args=(0.05,), name='fake-notion-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def inject(self, status: int, *, times: int = 1, retry_after: float = None):
+        """next `times` requests fail with status, eg inject(429, retry_after=0.1), inject(502, times=2)"""
+        with self._lock:
+            self._faults.extend([(status, retry_after)] * times)
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = {}
+            for _method, _path, status in self.requests:
+                statuses[status] = statuses.get(status, 0) + 1
+            return {
+                'requests': len(self.requests),
+                'statuses': statuses,
+                'connections': self.connections,
+                'max_in_flight': self.max_in_flight,
+            }
+
+    def _throttle(self):
+        """error to send instead of a response, None to serve the request"""
+        with self._lock:
+            if self._faults:
+                status, retry_after = self._faults.popleft()
+                return self._error(status, retry_after)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self._error(502, None)
+            if self.rate_limit:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_limit)
+                self._updated = now
+                if self._tokens < 1:
+                    return self._error(429, (1 - self._tokens) / self.rate_limit)
+                self._tokens -= 1
+        return None
+
+    @staticmethod
+    def _error(status, retry_after):
+        if status == 429:
+            headers = {'Retry-After': f'{retry_after:g}'} if retry_after is not None else {}
+            return NotionError(429, 'rate_limited', 'You have been rate limited.', headers)
+        if status == 502:
+            return NotionError(502, 'bad_gateway', 'Bad gateway.')
+        return NotionError(status, 'internal_server_error', 'Injected error.')
+
+    def _paginate(self, items, params):
+        """https://developers.notion.com/reference/pagination, cursor is the index of the next item"""
+        page_size = min(int(params.get('page_size') or MAX_PAGE_SIZE), MAX_PAGE_SIZE)
+        start = int(params.get('start_cursor') or 0)
+        results = items[start:start + page_size]
+        more = start + page_size < len(items)
+        return {
+            'object': 'list',
+            'results': results,
+            'next_cursor': str(start + page_size) if more else None,
+            'has_more': more,
+        }
+
+    def _route(self, method, path, body):
+        store = self.store
+        for route_method, pattern, name in _ROUTES:
+            match = pattern.fullmatch(path)
+            if match and route_method == method:
+                with store.lock:
+                    # serialized in the lock, other requests can change the objects
+                    return json.dumps(getattr(self, f'_{name}')(body, *match.groups()))
+        raise NotionError(400, 'invalid_request_url', 'Invalid request URL.')
+
+    # endpoints, same order as Client
+
+    def _query_database(self, body, database_id):
+        self.store.get(database_id, 'database')
+        pages = [
+            obj for obj in self.store.objects.values()
+            if obj['object'] == 'page' and not obj['archived']
+            and obj['parent'].get('database_id') == database_id
+        ]
+        return self._paginate(pages, body)
+
+    def _create_database(self, body):
+        return self.store.create_database(body)
+
+    def _update_database(self, body, database_id):
+        return self.store.update_database(self.store.get(database_id, 'database'), body)
+
+    def _retrieve_database(self, body, database_id):
+        return self.store.get(database_id, 'database')
+
+    def _retrieve_page(self, body, page_id):
+        return self.store.get(page_id, 'page')
+
+    def _create_page(self, body):
+        return self.store.create_page(body)
+
+    def _update_page(self, body, page_id):
+        return self.store.update(self.store.get(page_id, 'page'), body)
+
+    def _retrieve_page_property_item(self, body, page_id, property_id):
+        page = self.store.get(page_id, 'page')
+        prop = next((p for name, p in page['properties'].items() if property_id in (name, p.get('id'))), None)
+        if prop is None:
+            raise NotionError(404, 'object_not_found', f'Could not find property with ID: {property_id}.')
+        type_ = prop['type']
+        values = prop[type_] if isinstance(prop[type_], list) else [prop[type_]]
+        items = [{'object': 'property_item', 'id': prop['id'], 'type': type_, type_: value} for value in values]
+        return self._paginate(items, body)
+
+    def _retrieve_block(self, body, block_id):
+        return self.store.get(block_id, 'block')
+
+    def _update_block(self, body, block_id):
+        return self.store.update_block(self.store.get(block_id, 'block'), body)
+
+    def _retrieve_block_children(self, body, block_id):
+        self.store.get(block_id)
+        children = [self.store.objects[i] for i in self.store.children.get(block_id) or []]
+        return self._paginate(children, body)
+
+    def _append_block_children(self, body, block_id):
+        created = self.store.append_children(block_id, body.get('children') or [], after=body.get('after'))
+        return {'object': 'list', 'results': created, 'next_cursor': None, 'has_more': False}
+
+    def _delete_block(self, body, block_id):
+        return self.store.delete_block(block_id)
+
+    def _retrieve_user(self, body, user_id):
+        user = self.store.users.get(user_id)
+        if user is None:
+            raise NotionError(404, 'object_not_found', f'Could not find user with ID: {user_id}.')
+        return user
+
+    def _list_users(self, body):
+        return self._paginate(list(self.store.users.values()), body)
+
+    def _retrieve_bot_user(self, body):
+        return self.store.users[self.store.bot_id]
+
+    def _search(self, body):
+        query = (body.get('query') or '').lower()
+        object_type = (body.get('filter') or {}).get('value')
+        results = [
+            obj for obj in self.store.objects.values()
+            if obj['object'] in ('page', 'database') and not obj['archived']
+            and (not object_type or obj['object'] == object_type)
+            and query in self.store.title(obj).lower()
+        ]
+        return self._paginate(results, body)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive, so connection reuse of clients can be measured
+            protocol_version = 'HTTP/1.1'
+            # headers and body in one packet, otherwise delayed ACK adds ~40ms to every response
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, data, headers=None):
+                payload = (data if isinstance(data, str) else json.dumps(data)).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _response(self):
+                """status, data and headers of the response"""
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                try:
+                    url = urlsplit(self.path)
+                    # params of GET can be in the query string or, as Client sends them, in the json body
+                    body = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                    body.update(json.loads(raw) if raw else {})
+                    if server.latency:
+                        time.sleep(server.latency)
+                    error = server._throttle()
+                    if error:
+                        raise error
+                    return 200, server._route(self.command.lower(), url.path, body), None
+                except NotionError as exc:
+                    return exc.status, {'object': 'error', 'status': exc.status, 'code': exc.code, 'message': str(exc)}, exc.headers
+                except (ValueError, KeyError, TypeError) as exc:
+                    return 400, {'object': 'error', 'status': 400, 'code': 'validation_error', 'message': repr(exc)}, None
+
+            def _handle(self):
+                with server._lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    status, data, headers = self._response()
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+                # recorded before the client gets the response
+                with server._lock:
+                    server.requests.append((self.command, self.path, status))
+                self._send(status, data, headers)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+        return Handler
+
+
+_ID = '([0-9a-f-]+)'
+# (method, path pattern, FakeNotionServer method without _)
+_ROUTES = [
+    (method, re.compile(path.replace('{id}', _ID)), name)
+    for method, path, name in [
+        ('post', '/v1/databases/{id}/query', 'query_database'),
+        ('post', '/v1/databases', 'create_database'),
+        ('patch', '/v1/databases/{id}', 'update_database'),
+        ('get', '/v1/databases/{id}', 'retrieve_database'),
+        ('get', '/v1/pages/{id}', 'retrieve_page'),
+        ('post', '/v1/pages', 'create_page'),
+        ('patch', '/v1/pages/{id}', 'update_page'),
+        ('get', '/v1/pages/{id}/properties/([^/]+)', 'retrieve_page_property_item'),
+        ('get', '/v1/blocks/{id}', 'retrieve_block'),
+        ('patch', '/v1/blocks/{id}', 'update_block'),
+        ('get', '/v1/blocks/{id}/children', 'retrieve_block_children'),
+        ('patch', '/v1/blocks/{id}/children', 'append_block_children'),
+        ('delete', '/v1/blocks/{id}', 'delete_block'),
+        ('get', '/v1/users/me', 'retrieve_bot_user'),
+        ('get', '/v1/users/{id}', 'retrieve_user'),
+        ('get', '/v1/users', 'list_users'),
+        ('post', '/v1/search', 'search'),
+    ]
+]
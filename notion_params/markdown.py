@@ -1,16 +1,68 @@
+import functools
+import hashlib
+import io
 import json
+import os
+import re
+import threading
 import warnings
+from collections import OrderedDict, deque
+from itertools import islice
 
 import marko
-import pydash
 import marko.ext.gfm.elements
 
 # see https://developers.notion.com/reference/rich-text#annotations
 NOTION_COLOR_NAMES = "gray", "brown", "orange", "yellow", "green", "blue", "purple", "pink", "red"
 
+# https://developers.notion.com/reference/request-limits#limits-for-property-values
+NOTION_TEXT_LIMIT = 2000  # text.content
+NOTION_RICH_TEXT_LIMIT = 100  # rich_text array
+
+
+def split_text(text_list, limit=NOTION_TEXT_LIMIT):
+    """split text objects with content longer than limit, each part keeps annotations and link"""
+    for item in text_list:
+        text = item.get('text')
+        content = text and text.get('content')
+        if not content or len(content) <= limit:
+            yield item
+            continue
+        for start in range(0, len(content), limit):
+            part = {**item, 'text': {**text, 'content': content[start:start + limit]}}
+            if 'link' in text:
+                part['text']['link'] = dict(text['link'])
+            if 'annotations' in item:
+                part['annotations'] = dict(item['annotations'])
+            yield part
+
+
+def _content(item):
+    """text.content of a text object, None for other objects"""
+    text = item.get('text') if isinstance(item, dict) else None
+    return text.get('content') if isinstance(text, dict) else None
+
+
+def _flatten(items):
+    # a rendered block can be a list of blocks when it's split by NOTION_RICH_TEXT_LIMIT
+    for item in items:
+        if isinstance(item, list):
+            yield from item
+        else:
+            yield item
+
+# style attribute in a <span> tag, value in double, single or no quotes
+_STYLE_ATTR = re.compile(r'''(?:^|\s)style\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''')
+# color or background-color declaration in a style value
+_COLOR_DECLARATION = re.compile(r'(?:^|;)\s*(color|background-color)\s*:\s*([^;]*)')
+
+
+@functools.lru_cache(maxsize=1024)
 def decode_style(code):
-    """simple <span style> decoder
+    """simple <span style> decoder, results are memoized because the same few tags repeat in a document
     :param code: inline html code, eg "<span style='color:blue'>" or "</span>" or any other inline html code
+        style can have multiple declarations, eg "<span style='font-weight:bold; color:red'>",
+        if there are more than one color or background-color, the last one is used
     :returns:
         if style match, return notion color code, "red", "blue" etc, see NOTION_COLOR_NAMES
         if /span return '/'
@@ -18,30 +70,23 @@ def decode_style(code):
     """
     if not code:
         return ''
-    code = code.lower().strip('<>')
+    code = code.lower().strip('<>').strip()
     if code == '/span':
         return '/'
-    if not code.startswith('span '):
+    if not code.startswith(('span ', 'span\t', 'span\n')):
         return ''
-    # faster coding than regex :D
-    while ' =' in code:
-        code = code.replace(' =', '=')
-    while '= ' in code:
-        code = code.replace('= ', '=')
-    style = next((i for i in code.split() if i.startswith('style=')), None)
-    if not style:
+    match = _STYLE_ATTR.search(code, 4)
+    if not match:
         return ''
-    style = style.split('=', 1)[-1].strip('"\'').split(':', 1)  # (color, blue)
+    style = next(i for i in match.groups() if i is not None)
+    result = ''
     # possible values https://developers.notion.com/reference/rich-text#annotations
-    if style[0] == 'color':
-        color, is_background = style[1], False
-    elif style[0] == 'background-color':
-        color, is_background = style[1], True
-    else:
-        return ''
-    if color not in NOTION_COLOR_NAMES:
-        color = "blue"  # show color is working but not the desired one
-    return color if not is_background else f'{color}_background'
+    for name, color in _COLOR_DECLARATION.findall(style):
+        color = color.strip()
+        if color not in NOTION_COLOR_NAMES:
+            color = "blue"  # show color is working but not the desired one
+        result = color if name == 'color' else f'{color}_background'
+    return result
 
 
 class MarkoNotionRenderer(marko.Renderer):
@@ -58,89 +103,104 @@ class MarkoNotionRenderer(marko.Renderer):
         return [self.render(child) for child in element.children]
 
     def _render_as(self, type_, element, **kw):
+        if element is None:
+            return {"type": type_, type_: {}}
+        text_list = self.render_children(element)
+        rich_text = []
         result = {
             "type": type_,
-            type_: {} if element is None else {'rich_text': self.render_children(element), **kw}
+            type_: {'rich_text': rich_text, **kw}
         }
+        items = iter(text_list)
 
         # fix custom block type
-        if type_ == 'paragraph' and result[type_].get('rich_text'):
+        if type_ == 'paragraph' and len(text_list) > 1:
             # scan for !!callout etc for custom paragraph
-            text_list = result[type_].get('rich_text')
-            line0 = pydash.get(text_list, '0.text.content')
-            line1 = pydash.get(text_list, '1.text.content')
-            if line0 and line0.startswith('!!') and line1 == '\n':
+            line0 = _content(text_list[0])
+            if line0 and line0.startswith('!!') and _content(text_list[1]) == '\n':
                 custom_type, *args = line0[2:].split()
                 args = {
                     k.strip(): v.strip()
                     for i in args
                     for k, v in [i.split('=', 1)]
                 }
-                # print('='*80, 'CUSTOM??', custom_type, args)
-                # print(repr(line0))
-                # print(repr(line1))
                 if custom_type in ('callout', 'todo', 'to_do', 'toggle'):
                     if custom_type == 'todo':
                         custom_type = 'to_do'
-                    result['type'] = custom_type
-                    result[custom_type] = result.pop(type_)
-                    result[custom_type]['rich_text'] = text_list[2:]
+                    result = {'type': custom_type, custom_type: result[type_]}
+                    type_ = custom_type
                     if args.get('emoji'):
-                        pydash.set_(result[custom_type], 'icon.emoji', args['emoji'])
+                        result[type_]['icon'] = {'emoji': args['emoji']}
                     if args.get('color'):
-                        pydash.set_(result[custom_type], 'color', args['color'])
-                    type_ = custom_type
-
-        # move 2nd level nested paragraph to rich_text array
-        # move 2nd level other block type to children
-        if result[type_] and type_ != 'paragraph':
-            text_list = result[type_].get('rich_text')
-            if text_list:
-                children = [
-                    i
-                    for i in text_list
-                    if i.get('type') and i.get('type') != 'paragraph'
-                ]
-                def copy_inner_paragraph():
-                    for item in text_list:
-                        if 'type' not in item:
-                            yield item
-                        elif item.get('type') == 'paragraph':
-                            yield from item['paragraph']['rich_text']
-                result[type_]['rich_text'] = list(copy_inner_paragraph())
-                if children:
-                    if type_ in ('quote',):
-                        # types that allow children
-                        result[type_]['children'] = children
-                    else:
-                        warnings.warn(f'Lost of inner blocks {[i["type"] for i in children]}')
-
-        # fix color
-        if type_ == 'paragraph' and result[type_].get('rich_text'):
-            # scan for <span style='color|background-color:<color>'> and </span>
-            text_list = result[type_].get('rich_text')
-            # {"text": {"content": "<span style='color:blue'>"}, "annotations": {"code": true}},
-            # {"text": {"content": "blue text"}},  <<< can be many in between
-            # {"text": {"content": "</span>"}, "annotations": {"code": true}},  <<< don't consider nesting style
-            def fix_color(text_list):
-                colors = []
-                for item in text_list:
-                    if pydash.get(item, 'annotations.code'):
-                        style = decode_style(pydash.get(item, 'text.content'))
-                        if style == '/':
-                            if colors:
-                                colors.pop(-1)  # remove last
-                                continue
-                        elif style:
-                            colors.append(style)  # support nesting color
+                        result[type_]['color'] = args['color']
+                    if type_ == 'to_do' and args.get('checked'):
+                        result[type_]['checked'] = args['checked'].lower() == 'true'
+                    # skip '!!custom' line
+                    next(items)
+                    next(items)
+
+        # one pass over text objects:
+        # - other than paragraph, move 2nd level nested paragraph to rich_text array,
+        #   move 2nd level other block type to children
+        # - paragraph, fix color: scan for <span style='color|background-color:<color>'> and </span>
+        #   {"text": {"content": "<span style='color:blue'>"}, "annotations": {"code": true}},
+        #   {"text": {"content": "blue text"}},  <<< can be many in between
+        #   {"text": {"content": "</span>"}, "annotations": {"code": true}},
+        # - split text longer than NOTION_TEXT_LIMIT
+        nested = type_ != 'paragraph'
+        colors = []
+        children = []
+        for item in _flatten(items) if nested else items:
+            if nested and 'type' in item:
+                if item['type'] == 'paragraph':
+                    # already colored and split when the inner paragraph was rendered
+                    rich_text.extend(item['paragraph']['rich_text'])
+                else:
+                    children.append(item)
+                continue
+            if not nested:
+                annotations = item.get('annotations')
+                if annotations and annotations.get('code'):
+                    style = decode_style(_content(item))
+                    if style == '/':
+                        if colors:
+                            colors.pop(-1)  # remove last
                             continue
-                        # otherwise pass through to be rendered as inline html
-                    if colors:
-                        pydash.set_(item, 'annotations.color', colors[-1])
-                    yield item
-            result[type_]['rich_text'] = list(fix_color(text_list))
-
-        return result
+                    elif style:
+                        colors.append(style)  # support nesting color
+                        continue
+                    # otherwise pass through to be rendered as inline html
+                if colors:
+                    item.setdefault('annotations', {})['color'] = colors[-1]
+            content = _content(item)
+            if content and len(content) > NOTION_TEXT_LIMIT:
+                rich_text.extend(split_text((item,)))
+            else:
+                rich_text.append(item)
+        if children:
+            if type_ in ('quote',):
+                # types that allow children
+                result[type_]['children'] = children
+            else:
+                warnings.warn(f'Lost of inner blocks {[i["type"] for i in children]}')
+
+        return self._split_block(result, type_)
+
+    def _split_block(self, result, type_):
+        """block with more than NOTION_RICH_TEXT_LIMIT text objects is split into blocks of the same type
+        children stay with the last block
+        """
+        text_list = result[type_].get('rich_text') if result[type_] else None
+        if not text_list or len(text_list) <= NOTION_RICH_TEXT_LIMIT:
+            return result
+        blocks = []
+        for start in range(0, len(text_list), NOTION_RICH_TEXT_LIMIT):
+            body = {k: v for k, v in result[type_].items() if k != 'children'}
+            body['rich_text'] = text_list[start:start + NOTION_RICH_TEXT_LIMIT]
+            blocks.append({**result, type_: body})
+        if 'children' in result[type_]:
+            blocks[-1][type_]['children'] = result[type_]['children']
+        return blocks
 
     def render_paragraph(self, element):
         # https://developers.notion.com/reference/block#paragraph-blocks
@@ -182,7 +242,7 @@ class MarkoNotionRenderer(marko.Renderer):
         }
         if url:
             # https://developers.notion.com/reference/rich-text#link-objects
-            pydash.set_(result, 'text.link.url', url)
+            result['text']['link'] = {'url': url}
         if annotations:
             result['annotations'] = annotations
         return result
@@ -193,8 +253,7 @@ class MarkoNotionRenderer(marko.Renderer):
     def render_list(self, element):
         # https://developers.notion.com/reference/block#numbered-list-item-blocks
         # https://developers.notion.com/reference/block#bulleted-list-item-blocks
-        result = self.render_children(element)
-        assert isinstance(result, list)
+        result = list(_flatten(self.render_children(element)))
         type_ = 'numbered_list_item' if element.ordered else 'bulleted_list_item'
         # print('render_list', type_, json.dumps(result, indent=4))
         for item in result:
@@ -350,7 +409,11 @@ class MarkoNotionRenderer(marko.Renderer):
         }
 
     def render_table_cell(self, element):
-        return [self._text(element)]
+        # a cell is plain text, inline pieces are joined as they are written, eg "my\\_var" is "my", "_", "var"
+        text = self.render_children(element)
+        if isinstance(text, list):
+            text = ''.join(_content(i) or '' for i in _flatten(text))
+        return list(split_text([{'text': {'content': text}}]))
 
 
 class MarkoNotionExt:
@@ -363,11 +426,116 @@ class MarkoNotionExt:
         marko.ext.gfm.elements.TableCell,
     ]
 
-_md = marko.Markdown(marko.Parser, MarkoNotionRenderer)
-_md.use(MarkoNotionExt)
+
+
+def _new_markdown():
+    markdown = marko.Markdown(marko.Parser, MarkoNotionRenderer)
+    markdown.use(MarkoNotionExt)
+    return markdown
+
+
+# marko keeps the state of a conversion in the Markdown instance, one instance per thread
+_local = threading.local()
+
+
+def _markdown():
+    markdown = getattr(_local, 'markdown', None)
+    if markdown is None:
+        markdown = _local.markdown = _new_markdown()
+    return markdown
+
+
+class MarkdownCache:
+    """LRU cache of md() results, bounded by number of entries and total bytes
+    keyed by hash of the text, results are saved as json and every hit returns a new copy,
+    so callers can change returned blocks without corrupting the cache
+    """
+
+    def __init__(self, maxsize: int = 1024, maxbytes: int = 16 * 1024 * 1024) -> None:
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> utf-8 json
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text):
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(data)
+
+    def put(self, key, value):
+        # kept as utf-8, so maxbytes counts bytes, non-ascii characters are 2-4 bytes
+        data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        if len(data) > self.maxbytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._entries[key] = data
+            self.bytes += len(data)
+            while len(self._entries) > self.maxsize or self.bytes > self.maxbytes:
+                _key, old = self._entries.popitem(last=False)
+                self.bytes -= len(old)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = self.hits = self.misses = 0
+
+    def info(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'bytes': self.bytes,
+        }
+
+
+_cache = None
+
+
+def enable_md_cache(maxsize: int = 1024, maxbytes: int = 16 * 1024 * 1024) -> MarkdownCache:
+    """cache md() and md_line() results, for templates converting the same text many times
+    :param maxsize: max number of texts
+    :param maxbytes: max total size of cached results, in bytes of utf-8 json
+    :returns: the cache, see MarkdownCache.info() for hit/miss counters
+    """
+    global _cache
+    _cache = MarkdownCache(maxsize=maxsize, maxbytes=maxbytes)
+    return _cache
+
+
+def disable_md_cache():
+    global _cache
+    _cache = None
+
 
 def md(text):
-    result = _md(text)
+    cache = _cache
+    if cache is None:
+        return _render(text)
+    key = cache.key(text)
+    result = cache.get(key)
+    if result is None:
+        result = _render(text)
+        cache.put(key, result)
+    return result
+
+
+def _render(text):
+    result = _markdown()(text)
     # flattn first level list, for list items inside a list block
     def iteritems():
         for idx, item in enumerate(result):
@@ -380,6 +548,137 @@ def md(text):
             yield item
     return list(iteritems())
 
+
+def _md_batch(texts):
+    return [md(text) for text in texts]
+
+
+def md_many(texts, workers: int = None, executor: str = 'process', chunksize: int = 1):
+    """md() of many texts in parallel, results are yielded in the same order as texts, each as soon as it's ready
+    ```
+    paths = sorted(Path('docs').glob('**/*.md'))
+    for path, blocks in zip(paths, md_many(p.read_text() for p in paths, workers=8)):
+        append_blocks(notion, page_ids[path], blocks)
+    ```
+    :param texts: iterable of markdown texts, read lazily
+    :param workers: number of processes or threads, default number of cpus
+    :param executor: 'process' to use all cores, 'thread' when texts are small or the md cache should be shared
+        each worker builds its marko.Markdown once and reuses it for every text
+    :param chunksize: texts sent to a worker at once, larger is less overhead for many small texts
+    Note: with 'process' each worker has its own copy of the md cache, see enable_md_cache()
+    """
+    # imported here, multiprocessing is slow to import and md() doesn't need it
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    workers = workers or os.cpu_count() or 1
+    # checked here, not in the generator, so bad arguments raise at the call
+    if executor == 'process':
+        make_pool = functools.partial(ProcessPoolExecutor, max_workers=workers, initializer=_markdown)
+    elif executor == 'thread':
+        make_pool = functools.partial(ThreadPoolExecutor, max_workers=workers, initializer=_markdown,
+                                      thread_name_prefix='notion-params-md')
+    else:
+        raise ValueError(f"executor must be 'process' or 'thread', got {executor!r}")
+    # pool is created on first next(), a generator that is never used starts no workers
+    return _md_many(make_pool, iter(texts), workers, chunksize)
+
+
+def _md_many(make_pool, texts, workers, chunksize):
+    pending = deque()
+    with make_pool() as pool:
+        try:
+            while True:
+                # bounded, texts are not all read into the pool queue
+                while len(pending) < workers * 2:
+                    batch = list(islice(texts, chunksize))
+                    if not batch:
+                        break
+                    pending.append(pool.submit(_md_batch, batch))
+                if not pending:
+                    return
+                yield from pending.popleft().result()
+        finally:
+            # caller stopped early or a conversion failed
+            for future in pending:
+                future.cancel()
+
+
+# block starts that md_iter() must not split in the middle, see md_iter()
+_FENCE = re.compile(r' {0,3}(`{3,}|~{3,})')
+_LIST_ITEM = re.compile(r'(?:[-+*]|\d{1,9}[.)])(?:\s|$)')
+# https://spec.commonmark.org/0.30/#html-blocks type 1-5 can have blank lines inside
+_HTML_BLOCKS = (
+    (re.compile(r' {0,3}<(?:script|pre|style)(?:\s|>|$)', re.I), ('</script>', '</pre>', '</style>')),
+    (re.compile(r' {0,3}<!--'), ('-->',)),
+    (re.compile(r' {0,3}<\?'), ('?>',)),
+    (re.compile(r' {0,3}<![A-Z]'), ('>',)),
+    (re.compile(r' {0,3}<!\[CDATA\['), (']]>',)),
+)
+
+
+def _html_block_end(line):
+    """end markers if line starts a html block that can have blank lines, otherwise None"""
+    for start, ends in _HTML_BLOCKS:
+        if start.match(line):
+            return ends
+    return None
+
+
+def md_iter(text_or_file):
+    """same blocks as md(), yielded while the text is parsed, for very large text
+    text is read line by line and split before a line that starts a new top-level element after blank lines,
+    each part is converted as soon as it's complete, so memory is bounded by the largest element
+    ```
+    with open('CHANGELOG.md') as f:
+        # append_blocks() sends every 100 blocks as soon as they are ready
+        append_blocks(notion, page_id, md_iter(f))
+    ```
+    :param text_or_file: markdown text, or file-like object / iterable of lines, with or without line endings,
+        eg text.splitlines()
+    Note: link reference definitions only work within the same part
+    """
+    lines = io.StringIO(text_or_file) if isinstance(text_or_file, str) else text_or_file
+    # lines of splitlines() have no line ending, the last line of a file may have none
+    lines = (line if line.endswith('\n') else line + '\n' for line in lines)
+    chunk = []
+    fence = None  # closing fence of fenced code
+    html_end = None  # end markers of html block
+    blank_from = None  # index of first line of trailing blank lines in chunk
+    for line in lines:
+        if fence:
+            chunk.append(line)
+            stripped = line.strip()
+            if stripped.startswith(fence) and not stripped.strip(fence[0]):
+                fence = None
+            continue
+        if html_end:
+            chunk.append(line)
+            if any(i in line.lower() for i in html_end):
+                html_end = None
+            continue
+        if not line.strip():
+            if blank_from is None:
+                blank_from = len(chunk)
+            chunk.append(line)
+            continue
+        if blank_from and not line[0].isspace() and not _LIST_ITEM.match(line):  # 0 if chunk is all blank
+            # previous element is finished, unless it's a list, which can continue after blank lines.
+            # blank lines go with the next part, a list at the end of text would swallow them
+            yield from _render(''.join(chunk[:blank_from]))
+            chunk = chunk[blank_from:]
+        blank_from = None
+        chunk.append(line)
+        match = _FENCE.match(line)
+        if match:
+            fence = match.group(1)
+            continue
+        html_end = _html_block_end(line)
+        if html_end and any(i in line.lower()[line.index('<') + 1:] for i in html_end):
+            html_end = None  # ends in the same line
+    if chunk:
+        yield from _render(''.join(chunk))
+
+
 def md_line(text):
     """for title"""
-    return pydash.get(md(text), '0.paragraph.rich_text') or text
+    blocks = md(text)
+    return blocks and (blocks[0].get('paragraph') or {}).get('rich_text') or text
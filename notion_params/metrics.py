@@ -0,0 +1,251 @@
+import bisect
+import re
+import threading
+import warnings
+from typing import Iterable
+
+# path segment after these names is an id, see endpoint_template()
+_ID_PARAMS = {
+    'databases': 'database_id',
+    'pages': 'page_id',
+    'blocks': 'block_id',
+    'users': 'user_id',
+    'properties': 'property_id',
+}
+_ID_SEGMENT = re.compile(r'/(databases|pages|blocks|users|properties)/(?!me$)([^/?]+)')
+
+# seconds, same as the default buckets of prometheus clients
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def endpoint_template(url: str) -> str:
+    """url of a request with ids replaced by names, eg /v1/blocks/{block_id}/children"""
+    return _ID_SEGMENT.sub(lambda m: f'/{m.group(1)}/{{{_ID_PARAMS[m.group(1)]}}}', url.split('?', 1)[0])
+
+
+class RequestEvent:
+    """one attempt of a request, passed to every callback of Hooks
+    - method, endpoint (template, see endpoint_template()), url, attempt (1 for first try)
+    - wait: seconds waited for the rate limiter and concurrency limit before sending
+    - status, duration (seconds), bytes_sent, bytes_received: after a response, otherwise None
+    - retry_delay: seconds before the next attempt, in retry()
+    - error: exception, in error()
+    """
+
+    __slots__ = ('method', 'endpoint', 'url', 'attempt', 'wait', 'status', 'duration',
+                 'bytes_sent', 'bytes_received', 'retry_delay', 'error')
+
+    def __init__(self, method: str, url: str, attempt: int) -> None:
+        self.method = (method or '').lower()
+        self.endpoint = endpoint_template(url)
+        self.url = url
+        self.attempt = attempt
+        self.wait = 0.0
+        self.status = None
+        self.duration = None
+        self.bytes_sent = None
+        self.bytes_received = None
+        self.retry_delay = None
+        self.error = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__ if getattr(self, name) is not None)
+        return f'RequestEvent({fields})'
+
+
+class Hooks:
+    """callbacks of Client and AsyncClient, subclass and override any of them
+    ```
+    class SlowLog(Hooks):
+        def after(self, event):
+            if event.duration > 1:
+                print('slow', event.endpoint, event.duration)
+    notion = Client(hooks=[SlowLog(), HistogramCollector()])
+    ```
+    callbacks are called in the thread or event loop of the request, they should be fast,
+    exceptions in callbacks are turned into warnings
+    """
+
+    def before(self, event: RequestEvent):
+        """request is about to be sent, limits are acquired"""
+
+    def after(self, event: RequestEvent):
+        """response is received, any status"""
+
+    def retry(self, event: RequestEvent):
+        """response is 429/502 and the request is sent again after event.retry_delay"""
+
+    def error(self, event: RequestEvent):
+        """request failed and the error is raised, after all retries, or no response, eg connection error"""
+
+
+def make_hooks(hooks) -> list:
+    """list of Hooks from None, one Hooks or an iterable of them"""
+    if hooks is None:
+        return []
+    if isinstance(hooks, Hooks):
+        return [hooks]
+    return list(hooks)
+
+
+def emit(hooks, name, event):
+    for hook in hooks:
+        try:
+            getattr(hook, name)(event)
+        except Exception as exc:
+            warnings.warn(f'{type(hook).__name__}.{name} failed: {exc!r}')
+
+
+def body_size(body) -> int:
+    if not body:
+        return 0
+    return len(body.encode('utf-8') if isinstance(body, str) else body)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)  # last is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+
+class HistogramCollector(Hooks):
+    """in-memory metrics of all requests, by method, endpoint and status, thread safe
+    ```
+    metrics = HistogramCollector()
+    notion = Client(hooks=metrics)
+    ...
+    print(metrics.openmetrics())  # or serve it for prometheus
+    ```
+    :param buckets: upper bounds in seconds of duration buckets
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._durations = {}  # (method, endpoint, status) -> _Histogram
+        self._waits = {}  # (method, endpoint) -> _Histogram
+        self._counters = {}  # (name, method, endpoint, status) -> number
+
+    def _observe(self, histograms, key, value):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = _Histogram(self.buckets)
+        histogram.counts[bisect.bisect_left(self.buckets, value)] += 1
+        histogram.count += 1
+        histogram.sum += value
+
+    def _add(self, name, event, value=1):
+        key = (name, event.method, event.endpoint, str(event.status or ''))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def before(self, event):
+        with self._lock:
+            self._observe(self._waits, (event.method, event.endpoint), event.wait)
+
+    def after(self, event):
+        with self._lock:
+            self._observe(self._durations, (event.method, event.endpoint, str(event.status)), event.duration)
+            self._add('sent_bytes', event, event.bytes_sent or 0)
+            self._add('received_bytes', event, event.bytes_received or 0)
+
+    def retry(self, event):
+        with self._lock:
+            self._add('retries', event)
+            self._add('retry_delay_seconds', event, event.retry_delay)
+
+    def error(self, event):
+        with self._lock:
+            self._add('errors', event)
+
+    def snapshot(self) -> dict:
+        """{'duration': {(method, endpoint, status): {'count', 'sum', 'buckets': {le: cumulative count}}},
+        'wait': {(method, endpoint): same}, 'counters': {(name, method, endpoint, status): number}}
+        """
+        with self._lock:
+            return {
+                'duration': {key: self._histogram(h) for key, h in self._durations.items()},
+                'wait': {key: self._histogram(h) for key, h in self._waits.items()},
+                'counters': dict(self._counters),
+            }
+
+    def _histogram(self, histogram):
+        cumulative = 0
+        buckets = {}
+        for le, count in zip(self.buckets + (float('inf'),), histogram.counts):
+            cumulative += count
+            buckets[le] = cumulative
+        return {'count': histogram.count, 'sum': histogram.sum, 'buckets': buckets}
+
+    def clear(self):
+        with self._lock:
+            self._durations.clear()
+            self._waits.clear()
+            self._counters.clear()
+
+    def openmetrics(self, prefix: str = 'notion') -> str:
+        """metrics in OpenMetrics text format, https://openmetrics.io, content type
+        `application/openmetrics-text; version=1.0.0; charset=utf-8`
+        """
+        return openmetrics(self.snapshot(), prefix)
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def openmetrics(snapshot: dict, prefix: str = 'notion') -> str:
+    """OpenMetrics text of HistogramCollector.snapshot()"""
+    lines = []
+
+    def histogram(name, help, values, label_names):
+        metric = f'{prefix}_{name}_seconds'
+        lines.append(f'# TYPE {metric} histogram')
+        lines.append(f'# UNIT {metric} seconds')
+        lines.append(f'# HELP {metric} {help}')
+        for key, value in sorted(values.items()):
+            labels = _labels(**dict(zip(label_names, key)))
+            for le, count in value['buckets'].items():
+                lines.append(f'{metric}_bucket{{{labels},le="{_number(float(le))}"}} {count}')
+            lines.append(f'{metric}_count{{{labels}}} {value["count"]}')
+            lines.append(f'{metric}_sum{{{labels}}} {_number(value["sum"])}')
+
+    histogram('request_duration', 'time from sending a request to its response', snapshot['duration'],
+              ('method', 'endpoint', 'status'))
+    histogram('request_wait', 'time waiting for the rate limiter and concurrency limit', snapshot['wait'],
+              ('method', 'endpoint'))
+    counters = {}
+    for (name, method, endpoint, status), value in snapshot['counters'].items():
+        counters.setdefault(name, []).append(((method, endpoint, status), value))
+    helps = {
+        'sent_bytes': 'request body bytes',
+        'received_bytes': 'response body bytes',
+        'retries': 'requests sent again after 429/502',
+        'retry_delay_seconds': 'time slept before retries',
+        'errors': 'requests failed after retries, or without response',
+    }
+    for name in ('sent_bytes', 'received_bytes', 'retries', 'retry_delay_seconds', 'errors'):
+        if name not in counters:
+            continue
+        metric = f'{prefix}_request_{name}'
+        lines.append(f'# TYPE {metric} counter')
+        if name.endswith('_seconds'):
+            lines.append(f'# UNIT {metric} seconds')
+        elif name.endswith('_bytes'):
+            lines.append(f'# UNIT {metric} bytes')
+        lines.append(f'# HELP {metric} {helps[name]}')
+        for (method, endpoint, status), value in sorted(counters[name]):
+            labels = _labels(method=method, endpoint=endpoint, status=status)
+            lines.append(f'{metric}_total{{{labels}}} {_number(value)}')
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,199 @@
+import json
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # not available on windows, FileRateLimiter can't be used
+    fcntl = None
+
+# https://developers.notion.com/reference/request-limits
+# average 3 requests per second per integration, some bursts beyond are allowed
+NOTION_RATE_LIMIT = 3
+
+# rate limited or server overloaded, both mean slow down
+THROTTLED_STATUS = (429, 502)
+
+
+def parse_retry_after(value) -> float:
+    """Retry-After header is seconds or http-date, returns seconds or None if missing/invalid"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def retry_delay(status_code, tries, retry_after=None) -> float:
+    """retry semantics shared by Client and AsyncClient
+    :param status_code: http status of the failed response
+    :param tries: number of responses with this status so far, 1 for first failure
+    :param retry_after: value of Retry-After header
+    :returns: seconds to sleep before retry, None to give up
+        - 429 is retried until succ or other error, sleeps as long as Retry-After says,
+            without the header sleeps 1, 2, 4, 8, 10, 10... seconds
+        - 502 is retried 3 times, 2 seconds apart
+        - otherwise give up
+    """
+    if status_code == 429:
+        delay = parse_retry_after(retry_after)
+        return delay if delay is not None else min(10, 2 ** (tries - 1))
+    if status_code == 502:
+        return 2 if tries < 3 else None
+    return None
+
+
+class RateLimiter:
+    """token bucket limits requests per second, one instance can be shared by threads and clients
+    ```
+    limiter = RateLimiter(rate=3)
+    notion1 = Client(limiter=limiter)
+    notion2 = Client(limiter=limiter)  # both clients together stay under 3 req/s
+    ```
+    :param rate: tokens refilled per second
+    :param burst: max tokens can be saved for a burst, default same as rate
+    """
+
+    def __init__(self, rate: float = NOTION_RATE_LIMIT, burst: float = None) -> None:
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = rate
+        self.burst = burst or rate
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def _take(self, tokens, updated, now):
+        """refill since updated, take one token
+        tokens can go negative, that is a reservation for a future slot.
+        :returns: new tokens and seconds to wait before the taken token is valid
+        """
+        tokens = min(self.burst, tokens + (now - updated) * self.rate) - 1
+        return tokens, max(0.0, -tokens / self.rate)
+
+    def reserve(self) -> float:
+        """take one token, return seconds caller must wait before sending the request
+        async callers can `await asyncio.sleep(limiter.reserve())`
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens, delay = self._take(self._tokens, self._updated, now)
+            self._updated = now
+            return delay
+
+    def acquire(self):
+        """block until a request can be sent"""
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+
+class FileRateLimiter(RateLimiter):
+    """token bucket saved in a file, shared by all processes using the same path
+    use one path per token, eg. workers of a job importing into the same workspace
+    ```
+    notion = Client(limiter=FileRateLimiter('/tmp/notion-ratelimit'))
+    ```
+    """
+
+    def __init__(self, path: str, rate: float = NOTION_RATE_LIMIT, burst: float = None) -> None:
+        if fcntl is None:
+            raise NotImplementedError('FileRateLimiter needs fcntl')
+        super().__init__(rate=rate, burst=burst)
+        self.path = path
+
+    def reserve(self) -> float:
+        # thread lock first because flock is per open file, not per thread
+        with self._lock, open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                # wall clock because monotonic clock is not comparable between processes
+                now = time.time()
+                try:
+                    state = json.loads(f.read())
+                    tokens, updated = state['tokens'], state['updated']
+                except (ValueError, KeyError):
+                    # new or broken file, start with a full bucket
+                    tokens, updated = self.burst, now
+                tokens, delay = self._take(tokens, updated, now)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({'tokens': tokens, 'updated': now}))
+                f.flush()
+                return delay
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit of requests in flight, one instance can be shared by threads, clients and event loops
+    - 429 or 502 response: limit is multiplied by `decrease` (at most once per `cooldown` seconds,
+        all requests in flight at the time usually fail together and count as one signal)
+    - other response: limit grows by 1/limit, ie. +1 after a full window of successes
+    bulk jobs settle around the highest concurrency the workspace accepts
+    ```
+    concurrency = AdaptiveConcurrency(initial=4, maximum=16)
+    notion = Client(concurrency=concurrency)
+    async_notion = AsyncClient(concurrency=concurrency)
+    ```
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32, decrease: float = 0.5, cooldown: float = 1.0) -> None:
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError('need 1 <= minimum <= initial <= maximum')
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.limit = float(initial)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._last_decrease = None
+
+    def _available(self):
+        return self.in_flight < int(self.limit)
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if not self._available():
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self):
+        """block until a request can be sent"""
+        with self._cond:
+            self._cond.wait_for(self._available)
+            self.in_flight += 1
+
+    async def acquire_async(self, poll: float = 0.005):
+        """same as acquire() without blocking the event loop
+        polls because the state is shared with threads, asyncio primitives are not thread safe
+        """
+        # imported here, asyncio is slow to import and sync Client doesn't need it
+        import asyncio
+        while not self.try_acquire():
+            await asyncio.sleep(poll)
+
+    def release(self, status_code: int = None):
+        """must be called once for every acquire
+        :param status_code: response status, None if no response (eg connection error) to keep the limit
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if status_code in THROTTLED_STATUS:
+                now = time.monotonic()
+                if self._last_decrease is None or now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+            elif status_code is not None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
@@ -0,0 +1,333 @@
+import threading
+import time
+from typing import Any, Iterable, Iterator, List, Mapping
+
+
+def _is_null(value):
+    # None, NaN of float and numpy, NaT of pandas, empty string, eg an empty cell of a csv
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    try:
+        return bool(value != value)
+    except TypeError:
+        # pandas NA of nullable dtypes, NA != NA is NA and bool(NA) raises
+        return True
+    except ValueError:
+        # array like
+        return False
+
+
+def _text(value):
+    # special value format for title and rich_text, must be array
+    if _is_null(value):
+        return []
+    return [{'text': {'content': str(value)}}]
+
+
+def _raw(value):
+    # other types, value must already be in notion format
+    return value
+
+
+def _items(value):
+    """list of a list like value, a string is split by comma, eg 'a, b' from a csv"""
+    if _is_null(value):
+        return []
+    if isinstance(value, str):
+        return [i.strip() for i in value.split(',') if i.strip()]
+    if isinstance(value, (list, tuple, set)) or hasattr(value, 'tolist'):
+        return list(value.tolist() if hasattr(value, 'tolist') else value)
+    return [value]
+
+
+def _number(value):
+    if _is_null(value):
+        return None
+    if isinstance(value, str):
+        # thousands separator, eg "1,234.5"
+        return float(value.replace(',', ''))
+    # numpy scalars are not json serializable
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _string(value):
+    # url, email, phone_number
+    return None if _is_null(value) else str(value)
+
+
+def _select(value):
+    if isinstance(value, dict):
+        return value
+    return None if _is_null(value) else {'name': str(value)}
+
+
+def _multi_select(value):
+    return [i if isinstance(i, dict) else {'name': str(i)} for i in _items(value)]
+
+
+def _iso(value):
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def _date(value):
+    """date, datetime, pandas Timestamp or iso string, (start, end) tuple for a range"""
+    if isinstance(value, dict):
+        return value
+    if _is_null(value):
+        return None
+    if isinstance(value, tuple):
+        start, end = value
+        return {'start': _iso(start), 'end': None if _is_null(end) else _iso(end)}
+    return {'start': _iso(value)}
+
+
+def _checkbox(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('yes', 'y', 'true', 't', '1')
+    return False if _is_null(value) else bool(value)
+
+
+def _people(value):
+    return [i if isinstance(i, dict) else {'object': 'user', 'id': str(i)} for i in _items(value)]
+
+
+def _relation(value):
+    return [i if isinstance(i, dict) else {'id': str(i)} for i in _items(value)]
+
+
+# https://developers.notion.com/reference/property-value-object
+# column type -> function(value) -> notion property value
+# values already in notion format, eg {'name': 'x'} of select, are kept as is
+CONVERTERS = {
+    'title': _text,
+    'rich_text': _text,
+    'number': _number,
+    'select': _select,
+    'multi_select': _multi_select,
+    'date': _date,
+    'checkbox': _checkbox,
+    'url': _string,
+    'email': _string,
+    'phone_number': _string,
+    'people': _people,
+    'relation': _relation,
+}
+
+
+def _default_column_types(columns, column_types=None):
+    """first column is title, others are column_types[column] or 'rich_text'"""
+    return {
+        column: (column_types and column_types.get(
+            column) or 'rich_text') if idx else 'title'
+        for idx, column in enumerate(columns)
+    }
+
+
+class RowSerializer:
+    """NotionParams.create_database_row compiled once for a database schema,
+    column types and conversion functions are looked up once instead of for every row
+    ```
+    serializer = RowSerializer.from_database(notion.retrieve_database(db_id))
+    # or RowSerializer.from_columns(df.columns, column_types={'price': 'number'})
+    for properties in serializer.serialize(df):
+        notion.create_page(parent={'database_id': db_id}, properties=properties)
+    ```
+    :param column_types: column name -> notion property type, in column order
+    :param property_ids: column name -> property id, properties are sent by id instead of name,
+        so they still match when the column is renamed in Notion
+    """
+
+    def __init__(self, column_types: Mapping[str, str], property_ids: Mapping[str, str] = None) -> None:
+        self.column_types = dict(column_types)
+        self.property_ids = dict(property_ids or {})
+        self._columns = [
+            (self.property_ids.get(column, column), column, type_, CONVERTERS.get(type_, _raw))
+            for column, type_ in self.column_types.items()
+        ]
+
+    @classmethod
+    def from_columns(cls, columns: List[str], column_types: Mapping[str, str] = None) -> 'RowSerializer':
+        """same column type rules as NotionParams.create_database_row()"""
+        return cls(_default_column_types(columns, column_types))
+
+    @classmethod
+    def from_database(cls, database: dict, columns: List[str] = None, *, by_id: bool = False) -> 'RowSerializer':
+        """:param database: response of client.retrieve_database()
+        :param columns: columns of rows, default all properties of the database
+        :param by_id: send properties by id, see property_ids
+        """
+        properties = database['properties']
+        if columns is not None:
+            missing = [column for column in columns if column not in properties]
+            if missing:
+                raise KeyError(f'not properties of database {database.get("id")}: {", ".join(map(str, missing))}')
+            properties = {column: properties[column] for column in columns}
+        return cls(
+            {name: prop['type'] for name, prop in properties.items()},
+            {name: prop['id'] for name, prop in properties.items()} if by_id else None,
+        )
+
+    def properties(self, row: Any) -> dict:
+        """:param row: dict, Series, namedtuple or anything row[column] works"""
+        if hasattr(row, '_fields'):
+            # namedtuple, eg df.itertuples()
+            row = row._asdict()
+        return {
+            key: {
+                'type': type_,
+                type_: convert(row[column]),
+            }
+            for key, column, type_, convert in self._columns
+        }
+
+    def serialize(self, rows: Iterable[Any]) -> Iterator[dict]:
+        """properties of each row
+        :param rows: DataFrame or iterable of rows, see properties()
+        """
+        if hasattr(rows, 'iloc'):
+            # DataFrame, convert column by column, see NotionParams.table_df_rows()
+            columns = [
+                (key, type_, list(map(convert, rows[column].tolist())))
+                for key, column, type_, convert in self._columns
+            ]
+            for idx in range(len(rows)):
+                yield {
+                    key: {
+                        'type': type_,
+                        type_: values[idx],
+                    }
+                    for key, type_, values in columns
+                }
+            return
+        for row in rows:
+            yield self.properties(row)
+
+    def create_database_row(self, db_id: str, row: Any, *, emoji: str = None) -> dict:
+        """params of client.create_page(), see NotionParams.create_database_row()"""
+        params = {
+            'parent': {
+                'type': 'database_id',
+                'database_id': db_id
+            },
+            'properties': self.properties(row),
+            # every database row is a page, here it can have children list of blocks
+            # 'children': [{block},...]
+        }
+        if emoji:
+            params['icon'] = {'emoji': emoji}
+        return params
+
+
+def _property_types(database):
+    return {name: (prop['type'], prop['id']) for name, prop in database['properties'].items()}
+
+
+def _is_validation_error(exc):
+    """400 validation_error, eg a property was deleted, renamed or changed type since the schema was read"""
+    response = getattr(exc, 'response', None)
+    if response is None or getattr(response, 'status_code', None) != 400:
+        return False
+    try:
+        return response.json().get('code') == 'validation_error'
+    except ValueError:
+        return False
+
+
+class DatabaseWriter:
+    """create rows of a database with property types from its schema, no column_types needed
+    the schema is read once with client.retrieve_database(), and again only when the API rejects
+    a row with validation_error, the row is sent once more only if property types or ids changed,
+    eg a column changed type in Notion, otherwise the error is raised, eg a bad value
+    ```
+    writer = DatabaseWriter(notion, db_id)
+    for _idx, row in df.iterrows():
+        writer.create(row)  # {'price': 1.5, 'tags': 'a, b', 'due': date(2022, 1, 1), 'owner': user_id}
+    # or with a thread pool
+    bulk_create_database_rows(notion, db_id, df, serializer=writer.serializer(df.columns))
+    ```
+    values are converted by property type, see CONVERTERS, eg number, select, multi_select, date, checkbox,
+    url, email, people (user ids) and relation (page ids), lists can be a comma separated string
+    :param columns: columns of rows, default keys of the first row
+    :param emoji: icon of created rows
+    :param refresh_interval: seconds after reading the schema when errors don't read it again,
+        so a run of rows with bad values doesn't read the schema for every row
+    Note: with a ResponseCache on the client, the cached schema is dropped before it is read again
+    """
+
+    def __init__(self, client, db_id: str, *, columns: List[str] = None, emoji: str = None,
+                 refresh_interval: float = 60) -> None:
+        self.client = client
+        self.db_id = db_id
+        self.columns = None if columns is None else list(columns)
+        self.emoji = emoji
+        self.refresh_interval = refresh_interval
+        self.refreshes = 0
+        self._database = None
+        self._serializer = None
+        self._refreshed = None  # time.monotonic() of the last refresh
+        self._lock = threading.Lock()
+
+    def schema(self) -> dict:
+        """response of retrieve_database(), read once"""
+        with self._lock:
+            if self._database is None:
+                self._database = self.client.retrieve_database(self.db_id)
+            return self._database
+
+    def refresh(self, serializer: RowSerializer = None) -> bool:
+        """read the schema again, returns True if property types or ids changed
+        if serializer is given, only when it's still the current one and the schema wasn't read in
+        refresh_interval, so rows failing together in threads cause one request
+        """
+        with self._lock:
+            if serializer is not None:
+                if serializer is not self._serializer:
+                    # replaced by another thread after a change
+                    return True
+                if self._refreshed is not None and time.monotonic() - self._refreshed < self.refresh_interval:
+                    return False
+            invalidate_cache = getattr(self.client, 'invalidate_cache', None)
+            if invalidate_cache is not None:
+                invalidate_cache(self.db_id)
+            database = self.client.retrieve_database(self.db_id)
+            self._refreshed = time.monotonic()
+            self.refreshes += 1
+            changed = self._database is None or _property_types(database) != _property_types(self._database)
+            self._database = database
+            if changed:
+                self._serializer = None
+            return changed
+
+    def serializer(self, columns: List[str] = None) -> RowSerializer:
+        """RowSerializer of columns, default all properties, properties are sent by id"""
+        database = self.schema()
+        if columns is None:
+            columns = self.columns
+        with self._lock:
+            serializer = self._serializer
+            if serializer is None or (columns is not None and list(serializer.column_types) != list(columns)):
+                serializer = self._serializer = RowSerializer.from_database(database, columns, by_id=True)
+            return serializer
+
+    def create_database_row(self, row: Any) -> dict:
+        """params of client.create_page()"""
+        serializer = self._serializer
+        if serializer is None:
+            # columns default to keys of the first row, same as bulk_create_database_rows()
+            columns = self.columns
+            if columns is None:
+                columns = list(row._fields if hasattr(row, '_fields') else row.keys())
+            serializer = self.serializer(columns)
+        return serializer.create_database_row(self.db_id, row, emoji=self.emoji)
+
+    def create(self, row: Any) -> dict:
+        """create a row, returns the page"""
+        serializer = self._serializer
+        try:
+            return self.client.create_page(**self.create_database_row(row))
+        except Exception as exc:
+            if not _is_validation_error(exc) or not self.refresh(serializer):
+                raise
+            return self.client.create_page(**self.create_database_row(row))
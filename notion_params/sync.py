@@ -0,0 +1,180 @@
+import difflib
+import hashlib
+import json
+from typing import List
+
+from .bulk import append_blocks
+from .export import _text_parts
+from .markdown import md
+
+# https://developers.notion.com/reference/update-a-block
+# blocks whose text can be changed in place, others are deleted and appended again
+UPDATABLE = (
+    'paragraph', 'heading_1', 'heading_2', 'heading_3',
+    'bulleted_list_item', 'numbered_list_item', 'quote', 'to_do', 'toggle', 'callout', 'code',
+)
+# never deleted by sync, deleting them archives a sub page or database
+KEEP_TYPES = ('child_page', 'child_database')
+# fields compared besides rich_text and children, see _payload()
+_FIELDS = ('language', 'checked', 'color', 'icon', 'table_width', 'has_column_header', 'has_row_header')
+
+
+def _payload(block):
+    """block content in the same form for md() output and API responses,
+    API responses have more fields with default values, eg color 'default', link None
+    """
+    type_ = block.get('type')
+    body = block.get(type_) or {}
+    payload = {'type': type_}
+    if 'rich_text' in body:
+        payload['text'] = [[content, dict(annotations or ()), url] for content, annotations, url in _text_parts(body['rich_text'])]
+    for field in _FIELDS:
+        value = body.get(field)
+        if field == 'icon' and value:
+            value = value.get('emoji')
+        if value and value != 'default':
+            payload[field] = value
+    if type_ == 'table_row':
+        payload['cells'] = [[[content, dict(annotations or ()), url] for content, annotations, url in _text_parts(cell)] for cell in body['cells']]
+    if type_ == 'image':
+        source = body.get(body.get('type') or 'external')
+        payload['url'] = source.get('url') if isinstance(source, dict) else source
+    return payload
+
+
+def _key(block, children):
+    """content hash of a block and its children"""
+    data = json.dumps([_payload(block), children], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _new_key(block):
+    type_ = block.get('type')
+    children = (block.get(type_) or {}).get('children') or []
+    return _key(block, [_new_key(child) for child in children])
+
+
+def _existing_key(client, block):
+    children = []
+    if block.get('has_children'):
+        children = [_existing_key(client, child) for child in client.retrieve_block_children(block['id'])]
+    return _key(block, children)
+
+
+def _can_update(old, new):
+    type_ = new.get('type')
+    return (
+        type_ == old.get('type')
+        and type_ in UPDATABLE
+        and not old.get('has_children')
+        and not (new.get(type_) or {}).get('children')
+        # an icon can't be removed by update
+        and not ((old.get(type_) or {}).get('icon') and not (new.get(type_) or {}).get('icon'))
+    )
+
+
+def _update_body(block):
+    """fields to update, update keeps fields not sent, so fields compared by _payload() are sent with defaults"""
+    type_ = block['type']
+    body = {k: v for k, v in block[type_].items() if k != 'children'}
+    if type_ == 'to_do':
+        body.setdefault('checked', False)
+    if type_ == 'code':
+        body.setdefault('language', 'plain text')
+    else:
+        body.setdefault('color', 'default')
+    return body
+
+
+def _plan(old_blocks, old_keys, new_blocks, new_keys):
+    """edit script: list of (action, old block, new block) in the order of the new page and list of blocks to delete
+    action is 'keep', 'update' or 'insert'
+    """
+    plan = []
+    deleted = []
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        olds, news = old_blocks[i1:i2], new_blocks[j1:j2]
+        if tag == 'equal':
+            plan.extend(('keep', old, new) for old, new in zip(olds, news))
+            continue
+        # changed blocks of the same type are updated in place, one request each instead of delete + append
+        while olds and news and _can_update(olds[0], news[0]):
+            plan.append(('update', olds.pop(0), news.pop(0)))
+        deleted.extend(olds)
+        plan.extend(('insert', None, new) for new in news)
+    # blocks can only be inserted after an existing block, inserts before the first kept block need a fix
+    first = next((idx for idx, (action, _, _) in enumerate(plan) if action != 'insert'), None)
+    if first:
+        top = plan[0][2]
+        # first kept block that can become the first new block, eg a blank line under a leading heading
+        anchor = next((
+            idx for idx in range(first, len(plan))
+            if plan[idx][0] != 'insert' and _can_update(plan[idx][1], top)
+        ), None)
+        if anchor is None:
+            # eg a divider on top, no block can become it, recreate all blocks
+            deleted.extend(old for action, old, _ in plan if action != 'insert')
+            plan = [('insert', None, new) for _, _, new in plan]
+        else:
+            # blocks above the anchor are deleted, the anchor is updated to the first new block,
+            # the new blocks before it and its own new content are inserted after it
+            deleted.extend(old for action, old, _ in plan[:anchor] if action != 'insert')
+            plan = (
+                [('update', plan[anchor][1], top)]
+                + [('insert', None, new) for _, _, new in plan[1:anchor + 1]]
+                + plan[anchor + 1:]
+            )
+    return plan, deleted
+
+
+def sync_markdown(client, page_id: str, text: str = None, *, blocks: List[dict] = None) -> dict:
+    """make children of page_id the same as md(text), only changed blocks are sent
+    existing and new blocks are compared by content hash, changed blocks are updated in place if possible,
+    otherwise deleted or inserted at their position, unchanged blocks are not touched
+    ```
+    sync_markdown(notion, status_page_id, render_status())  # a one-line change is one request
+    ```
+    :param text: markdown text
+    :param blocks: blocks to sync instead of md(text), eg from md_iter()
+    :returns: number of blocks by action, {'unchanged': 10, 'updated': 1, 'deleted': 0, 'appended': 2}
+    Note: child pages and databases are never deleted, new blocks may be inserted before or after them
+    """
+    new_blocks = list(md(text) if blocks is None else blocks)
+    old_blocks = [
+        block
+        for block in client.retrieve_block_children(page_id)
+        if block.get('type') not in KEEP_TYPES
+    ]
+    plan, deleted = _plan(
+        old_blocks, [_existing_key(client, block) for block in old_blocks],
+        new_blocks, [_new_key(block) for block in new_blocks],
+    )
+    counts = {'unchanged': 0, 'updated': 0, 'deleted': 0, 'appended': 0}
+    for block in deleted:
+        client.delete_block(block['id'])
+        counts['deleted'] += 1
+    anchor = None  # last block in the new order
+    inserts = []
+
+    def flush():
+        created = append_blocks(client, page_id, inserts, after=anchor)['results']
+        counts['appended'] += len(inserts)
+        inserts.clear()
+        return created[-1]['id'] if created else anchor
+
+    for action, old, new in plan:
+        if action == 'insert':
+            inserts.append(new)
+            continue
+        if inserts:
+            anchor = flush()
+        if action == 'update':
+            client.update_block(old['id'], **{new['type']: _update_body(new)})
+            counts['updated'] += 1
+        else:
+            counts['unchanged'] += 1
+        anchor = old['id']
+    if inserts:
+        flush()
+    return counts
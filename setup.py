@@ -18,12 +18,13 @@ setuptools.setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
     install_requires=[
         'marko==1.2.0',
-        'pydash',
         'requests',
-        'backoff',
     ],
+    extras_require={
+        'async': ['httpx'],
+    },
     py_modules=['notion_params']
 )
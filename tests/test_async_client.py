@@ -0,0 +1,126 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+from notion_params import AsyncClient
+
+
+def make_client(handler):
+    """AsyncClient with a mocked transport, handler(request) returns httpx.Response"""
+    calls = []
+
+    def record(request):
+        calls.append({
+            'method': request.method,
+            'url': str(request.url),
+            'json': json.loads(request.content) if request.content else None,
+        })
+        return handler(request)
+    return AsyncClient(token='secret', rate_limit=None, transport=httpx.MockTransport(record)), calls
+
+
+def test_api_query_database():
+    database_id = str(uuid4())
+    pages = iter([
+        {'results': [{'object': 'page'}, {'object': '2nd'}], 'next_cursor': 'cursor-value'},
+        {'results': [{'object': '3rd'}]},
+    ])
+    client, calls = make_client(lambda request: httpx.Response(200, json=next(pages)))
+
+    async def run():
+        async with client:
+            return [i async for i in client.query_database(database_id, filter={'property': 'x'})]
+    result = asyncio.run(run())
+
+    assert result == [{'object': 'page'}, {'object': '2nd'}, {'object': '3rd'}]
+    assert calls == [{
+        'method': 'POST',
+        'url': f'https://api.notion.com/v1/databases/{database_id}/query',
+        'json': {'filter': {'property': 'x'}},
+    }, {
+        'method': 'POST',
+        'url': f'https://api.notion.com/v1/databases/{database_id}/query',
+        'json': {'filter': {'property': 'x'}, 'start_cursor': 'cursor-value'},
+    }]
+
+
+def test_api_create_page_concurrently():
+    client, calls = make_client(lambda request: httpx.Response(200, json={'object': 'page'}))
+
+    async def run():
+        async with client:
+            return await asyncio.gather(*(
+                client.create_page(parent={'page_id': 'abc'}, properties={'title': str(i)})
+                for i in range(10)
+            ))
+    result = asyncio.run(run())
+
+    assert result == [{'object': 'page'}] * 10
+    assert sorted(i['json']['properties']['title'] for i in calls) == sorted(str(i) for i in range(10))
+    assert {i['method'] for i in calls} == {'POST'}
+
+
+def test_api_headers_and_get_without_body():
+    user_id = str(uuid4())
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json={'object': 'user'})
+    client = AsyncClient(token='secret', rate_limit=None, transport=httpx.MockTransport(handler))
+
+    async def run():
+        async with client:
+            return await client.retrieve_user(user_id)
+    assert asyncio.run(run()) == {'object': 'user'}
+    request, = requests_seen
+    assert request.method == 'GET'
+    assert request.content == b''
+    assert request.headers['Authorization'] == 'Bearer secret'
+    assert request.headers['Notion-Version'] == '2022-02-22'
+
+
+def test_retry_502(mocker):
+    sleep = mocker.patch('asyncio.sleep')
+    statuses = iter([502, 502, 200])
+    client, calls = make_client(lambda request: httpx.Response(next(statuses), json={}))
+
+    async def run():
+        async with client:
+            return await client.retrieve_block('abc')
+    assert asyncio.run(run()) == {}
+    assert len(calls) == 3
+    assert sleep.call_count == 2
+
+
+def test_giveup_other_error(mocker):
+    mocker.patch('asyncio.sleep')
+    client, calls = make_client(lambda request: httpx.Response(400, json={'code': 'validation_error'}))
+
+    async def run():
+        async with client:
+            return await client.delete_block('abc')
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(run())
+    assert len(calls) == 1
+    assert client._last_exc.response.status_code == 400
+
+
+def test_retry_429_honors_retry_after(mocker):
+    sleep = mocker.patch('asyncio.sleep')
+    responses = iter([
+        httpx.Response(429, headers={'Retry-After': '5'}, json={}),
+        httpx.Response(200, json={'object': 'block'}),
+    ])
+    client, calls = make_client(lambda request: next(responses))
+
+    async def run():
+        async with client:
+            return await client.retrieve_block('abc')
+    assert asyncio.run(run()) == {'object': 'block'}
+    assert len(calls) == 2
+    sleep.assert_called_once_with(5)
@@ -0,0 +1,261 @@
+import collections
+import json
+import threading
+import unittest.mock
+from itertools import count
+
+import pandas as pd
+import pytest
+import requests
+
+from notion_params import NotionParams as NP
+from notion_params import append_blocks, bulk_create_database_rows, upload_table
+
+
+class FakeClient:
+    """in memory blocks, enforce API limits of append_block_children"""
+
+    def __init__(self):
+        self.ids = count(1)
+        self.children = {}  # block_id -> [block]
+        self.calls = []
+
+    def _create(self, block, level):
+        type_ = block['type']
+        children = block[type_].get('children') or []
+        assert len(children) <= 100
+        assert level <= 2 or not children, 'nested more than 2 levels'
+        new_block = {'id': f'b{next(self.ids)}', 'type': type_, 'has_children': bool(children),
+                     type_: {k: v for k, v in block[type_].items() if k != 'children'}}
+        self.children[new_block['id']] = [self._create(i, level + 1) for i in children]
+        return new_block
+
+    def append_block_children(self, block_id, *, children):
+        self.calls.append(('append', block_id, len(children), len(json.dumps(children))))
+        assert len(children) <= 100
+        created = [self._create(i, 1) for i in children]
+        self.children.setdefault(block_id, []).extend(created)
+        return {'object': 'list', 'results': created}
+
+    def retrieve_block_children(self, block_id):
+        self.calls.append(('retrieve', block_id))
+        yield from self.children.get(block_id, [])
+
+    def tree(self, block_id):
+        return [
+            (i[i['type']].get('rich_text', [{}])[0].get('text', {}).get('content'), self.tree(i['id']))
+            for i in self.children.get(block_id, [])
+        ]
+
+
+def paragraph(text, children=None):
+    block = {'type': 'paragraph', 'paragraph': {'rich_text': [{'text': {'content': text}}]}}
+    if children:
+        block['paragraph']['children'] = children
+    return block
+
+
+def test_append_blocks_split_by_count():
+    client = FakeClient()
+    blocks = [paragraph(str(i)) for i in range(250)]
+    response = append_blocks(client, 'page', blocks)
+    assert [i[2] for i in client.calls] == [100, 100, 50]
+    assert len(response['results']) == 250
+    assert [i[0] for i in client.tree('page')] == [str(i) for i in range(250)]
+
+
+def test_append_blocks_split_by_bytes():
+    client = FakeClient()
+    blocks = [paragraph('x' * 1000) for i in range(20)]
+    append_blocks(client, 'page', blocks, max_bytes=5000)
+    assert all(i[3] <= 5000 for i in client.calls)
+    assert sum(i[2] for i in client.calls) == 20
+
+
+def test_append_blocks_nested():
+    client = FakeClient()
+    blocks = [
+        paragraph('a', [
+            paragraph('a1', [
+                paragraph('a11', [paragraph('a111')]),
+            ]),
+            paragraph('a2'),
+        ]),
+        paragraph('b'),
+    ]
+    original = json.dumps(blocks)
+    response = append_blocks(client, 'page', blocks)
+    assert json.dumps(blocks) == original, 'input should not be changed'
+    assert len(response['results']) == 2
+    assert client.tree('page') == [
+        ('a', [('a1', [('a11', [('a111', [])])]), ('a2', [])]),
+        ('b', []),
+    ]
+
+
+def test_append_blocks_many_nested_children():
+    client = FakeClient()
+    table = NP.table_df(pd.DataFrame({'k': range(150)}), include_rows=150)
+    assert len(table['table']['children']) == 151  # header + rows
+    append_blocks(client, 'page', [table])
+    table_block, = client.children['page']
+    assert len(client.children[table_block['id']]) == 151
+
+
+def test_append_blocks_max_children_nested():
+    client = FakeClient()
+    blocks = [paragraph('a', [paragraph(str(i)) for i in range(25)])]
+    append_blocks(client, 'page', blocks, max_children=10)
+    # 10 children are sent with the parent, the rest in follow-up requests
+    assert [i[2] for i in client.calls if i[0] == 'append'] == [1, 10, 5]
+    parent, = client.children['page']
+    assert [i[0] for i in client.tree(parent['id'])] == [str(i) for i in range(25)]
+
+
+def table_rows(client, table_id):
+    return [
+        [cell[0]['text']['content'] for cell in row['table_row']['cells']]
+        for row in client.children[table_id]
+    ]
+
+
+def test_upload_table_df():
+    client = FakeClient()
+    df = pd.DataFrame({'k': range(250), 'v': [f'v{i}' for i in range(250)]})
+    sent = []
+    table = upload_table(client, 'page', df, progress=sent.append)
+    assert table['type'] == 'table'
+    assert sent == [100, 200, 250]
+    rows = table_rows(client, table['id'])
+    assert rows[0] == ['k', 'v']
+    assert rows[1:] == [[str(i), f'v{i}'] for i in range(250)]
+    assert all(i[2] <= 100 for i in client.calls)
+
+
+def test_upload_table_df_chunks():
+    client = FakeClient()
+    chunks = (pd.DataFrame({'k': range(i, i + 30)}) for i in range(0, 90, 30))
+    table = upload_table(client, 'page', chunks, batch_size=50, has_column_header=False)
+    # small first chunk is sent with the table
+    assert [i[2] for i in client.calls if i[0] == 'append'] == [1, 30, 30]
+    assert table_rows(client, table['id']) == [[str(i)] for i in range(90)]
+
+
+def test_upload_table_rows():
+    client = FakeClient()
+    sent = []
+
+    def rows():
+        for i in range(5):
+            yield {'id': i, 'name': f'n{i}', 'ignored': None}
+    table = upload_table(client, 'page', rows(), columns=['name', 'id'], batch_size=2, progress=sent.append)
+    assert sent == [2, 4, 5]
+    assert table_rows(client, table['id']) == [['name', 'id']] + [[f'n{i}', str(i)] for i in range(5)]
+    assert table['table']['table_width'] == 2
+
+    client = FakeClient()
+    table = upload_table(client, 'page', [(1, 'a'), (2, 'b')], columns=['k', 'v'])
+    assert [i[2] for i in client.calls] == [1]  # small table in one request
+    assert table_rows(client, table['id']) == [['k', 'v'], ['1', 'a'], ['2', 'b']]
+
+    assert upload_table(FakeClient(), 'page', []) is None
+
+    client = FakeClient()
+    with pytest.raises(ValueError, match='columns'):
+        upload_table(client, 'page', [(1, 'a')])
+    table = upload_table(client, 'page', [(1, 'a')], has_column_header=False)
+    assert table_rows(client, table['id']) == [['1', 'a']]
+    with pytest.raises(ValueError, match='batch_size'):
+        upload_table(client, 'page', [(1, 'a')], columns=['k', 'v'], batch_size=101)
+
+
+class FakeDbClient:
+    def __init__(self, fail=None):
+        self.pages = []
+        self.lock = threading.Lock()
+        self.fail = fail or (lambda title: None)
+
+    def create_page(self, *, parent, properties, icon=None):
+        title = properties['k']['title'][0]['text']['content']
+        exc = self.fail(title)
+        if exc:
+            raise exc
+        with self.lock:
+            self.pages.append(title)
+        return {'id': title}
+
+
+def http_error(status_code):
+    response = unittest.mock.Mock(status_code=status_code)
+    return requests.exceptions.HTTPError(response=response)
+
+
+def test_bulk_create_database_rows(mocker):
+    sleep = mocker.patch('time.sleep')
+    tries = collections.Counter()
+
+    def fail(title):
+        tries[title] += 1
+        if title == '3' and tries[title] == 1:
+            return requests.exceptions.ConnectionError()
+        if title == '5' and tries[title] <= 2:
+            return http_error(500)
+    client = FakeDbClient(fail)
+    df = pd.DataFrame({'k': range(50), 'v': 'x'})
+    progress = []
+    assert bulk_create_database_rows(client, 'db', df, workers=4, progress=progress.append,
+                                     retry_connection_errors=True) == 50
+    assert sorted(client.pages, key=int) == [str(i) for i in range(50)]
+    assert progress[-1] == 50
+    assert tries['3'] == 2 and tries['5'] == 3
+    assert sleep.call_count == 3
+
+
+def test_bulk_create_database_rows_resume(tmp_path, mocker):
+    mocker.patch('time.sleep')
+    checkpoint = str(tmp_path / 'import.ckpt')
+    rows = [{'k': i, 'v': 'x'} for i in range(30)]
+    # 1st run fails on a validation error, no retry
+    client = FakeDbClient(lambda title: http_error(400) if title == '20' else None)
+    with pytest.raises(requests.exceptions.HTTPError):
+        bulk_create_database_rows(client, 'db', rows, workers=2, checkpoint=checkpoint)
+    first_run = set(client.pages)
+    assert '20' not in first_run and len(first_run) < 30
+    with open(checkpoint) as f:
+        # default key is the position of the row
+        assert {json.loads(i) for i in f} == {int(i) for i in first_run}
+
+    # 2nd run only creates the rest
+    client = FakeDbClient()
+    created = bulk_create_database_rows(client, 'db', rows, workers=2, checkpoint=checkpoint)
+    assert created == 30 - len(first_run)
+    assert first_run.isdisjoint(client.pages)
+    assert first_run | set(client.pages) == {str(i) for i in range(30)}
+
+
+def test_bulk_create_database_rows_duplicate_titles(tmp_path):
+    rows = [{'k': 'Alice'}] * 5 + [{'k': 'Bob'}]
+    client = FakeDbClient()
+    assert bulk_create_database_rows(client, 'db', rows, workers=2) == 6
+    assert sorted(client.pages) == ['Alice'] * 5 + ['Bob']
+    client = FakeDbClient()
+    checkpoint = str(tmp_path / 'import.ckpt')
+    assert bulk_create_database_rows(client, 'db', pd.DataFrame(rows), workers=2, checkpoint=checkpoint) == 6
+    assert len(client.pages) == 6
+    # same rows again, all skipped
+    assert bulk_create_database_rows(FakeDbClient(), 'db', rows, checkpoint=checkpoint) == 0
+
+
+def test_bulk_create_database_rows_no_retry(mocker):
+    sleep = mocker.patch('time.sleep')
+    tries = collections.Counter()
+
+    def fail(title):
+        tries[title] += 1
+        return {'1': requests.exceptions.ConnectionError(), '2': http_error(502)}.get(title)
+    for title in ('1', '2'):
+        with pytest.raises(requests.exceptions.RequestException):
+            bulk_create_database_rows(FakeDbClient(fail), 'db', [{'k': title}])
+        # connection error may have created the page, 502 is already retried by the client
+        assert tries[title] == 1
+    assert not sleep.called
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from notion_params import Client, FileResponseCache, ResponseCache
+from notion_params import NotionParams as NP
+from notion_params.fake_server import FakeNotionServer
+
+
+@pytest.fixture
+def server():
+    with FakeNotionServer() as server:
+        yield server
+
+
+def test_response_cache(server):
+    cache = ResponseCache(maxsize=2)
+    notion = Client('token', rate_limit=None, base_url=server.url, cache=cache)
+    page = notion.create_page(**NP.create_page(server.root_page_id, title='report', text='text'))
+    server.requests.clear()
+    first = notion.retrieve_page(page['id'])
+    # same id without dashes is the same entry, hit returns a copy
+    first['changed'] = True
+    second = notion.retrieve_page(page['id'].replace('-', ''))
+    assert 'changed' not in second and second['id'] == page['id']
+    assert len(server.requests) == 1
+    assert cache.info() == {'hits': 1, 'misses': 1, 'size': 1}
+    # update drops the page
+    notion.update_page(page['id'], **NP.update_page(title='new title'))
+    title = notion.retrieve_page(page['id'])['properties']['title']['title'][0]['text']['content']
+    assert title == 'new title'
+    block = next(notion.retrieve_block_children(page['id']))
+    assert notion.retrieve_block(block['id'])['archived'] is False
+    notion.delete_block(block['id'])
+    assert notion.retrieve_block(block['id'])['archived'] is True
+    # lru
+    notion.retrieve_page(server.root_page_id)
+    assert cache.info()['size'] == 2
+    server.requests.clear()
+    notion.retrieve_page(page['id'])
+    assert len(server.requests) == 1
+
+
+def test_response_cache_ttl(mocker):
+    cache = ResponseCache(ttl=10)
+    now = time.monotonic()
+    mocker.patch('time.monotonic', return_value=now)
+    cache.put('key', {'a': 1})
+    assert cache.get('key') == {'a': 1}
+    time.monotonic.return_value = now + 10
+    assert cache.get('key') is None
+    assert cache.info() == {'hits': 1, 'misses': 1, 'size': 0}
+
+
+def test_file_response_cache(server, tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    notion = Client('token', rate_limit=None, base_url=server.url, cache=FileResponseCache(path, maxsize=2))
+    db = notion.create_database(**NP.create_database(server.root_page_id, title='db', columns=['name', 'value']))
+    notion.retrieve_database(db['id'])
+    # another run
+    cache = FileResponseCache(path, maxsize=2)
+    notion = Client('token', rate_limit=None, base_url=server.url, cache=cache)
+    server.requests.clear()
+    assert notion.retrieve_database(db['id'])['id'] == db['id']
+    assert not server.requests
+    notion.update_database(db['id'], properties={'value': {'number': {}}})
+    assert notion.retrieve_database(db['id'])['properties']['value']['type'] == 'number'
+    assert len(server.requests) == 2
+    # lru and ttl
+    for key in 'abc':
+        cache.put(key, {})
+    assert cache.info()['size'] == 2 and cache.get('a') is None and cache.get('c') == {}
+    expired = FileResponseCache(path, ttl=0)
+    expired.put('c', {})
+    assert cache.get('c') is None
+    cache.clear()
+    assert cache.info() == {'hits': 0, 'misses': 0, 'size': 0}
@@ -656,3 +656,187 @@ def test_api_search():
         'method': 'post',
         'json': sample,
     }
+
+
+def http_error(status_code, headers=None):
+    import requests
+    response = unittest.mock.Mock(status_code=status_code, headers=headers or {})
+    return requests.exceptions.HTTPError(response=response)
+
+
+def test_retry_429_honors_retry_after(mocker):
+    from notion_params import Client
+    sleep = mocker.patch('time.sleep')
+    client = Client(rate_limit=None)
+    client._session.request.return_value.raise_for_status.side_effect = [
+        http_error(429, {'Retry-After': '7'}),
+        http_error(429),  # without header use exponential backoff
+        http_error(429),
+        None,
+    ]
+    client.retrieve_page('abc')
+    assert len(client._session.request.call_args_list) == 4
+    assert [i.args[0] for i in sleep.call_args_list] == [7, 2, 4]
+
+
+def test_retry_502_three_times(mocker):
+    import requests
+    from notion_params import NotionParams as NP
+    sleep = mocker.patch('time.sleep')
+    client = NP.get_client()
+    client._session.request.return_value.raise_for_status.side_effect = [
+        http_error(502), http_error(502), http_error(502),
+    ]
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.retrieve_page('abc')
+    assert len(client._session.request.call_args_list) == 3
+    assert [i.args[0] for i in sleep.call_args_list] == [2, 2]
+    assert client._last_exc.response.status_code == 502
+
+
+def test_no_retry_400(mocker):
+    import requests
+    from notion_params import NotionParams as NP
+    sleep = mocker.patch('time.sleep')
+    client = NP.get_client()
+    client._session.request.return_value.raise_for_status.side_effect = [http_error(400)]
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.retrieve_page('abc')
+    assert len(client._session.request.call_args_list) == 1
+    sleep.assert_not_called()
+
+
+def test_concurrency_released_on_throttle(mocker):
+    from notion_params import Client
+    from notion_params.ratelimit import AdaptiveConcurrency
+    mocker.patch('time.sleep')
+    concurrency = AdaptiveConcurrency(initial=8)
+    client = Client(concurrency=concurrency, rate_limit=None)
+    client._session.request.return_value.status_code = 429
+    client._session.request.return_value.raise_for_status.side_effect = [http_error(429), None]
+    client.retrieve_page('abc')
+    assert concurrency.in_flight == 0
+    assert concurrency.limit == 4  # halved on 429, 2nd release with status 429 is in cooldown
+
+
+def test_paginate_prefetch(mocker):
+    import threading
+    from notion_params import Client
+    client = Client(rate_limit=None, prefetch=1)
+    second_page_requested = threading.Event()
+    pages = iter([
+        {'results': [1, 2], 'next_cursor': 'c1'},
+        {'results': [3, 4], 'next_cursor': 'c2'},
+        {'results': [5]},
+    ])
+
+    def next_page():
+        page = next(pages)
+        if page['results'][0] == 3:
+            second_page_requested.set()
+        return page
+    client._session.request.return_value.json.side_effect = next_page
+    mock_copy = copy_call_args(client._session.request)
+
+    results = client.list_users()
+    assert next(results) == 1
+    # next page is fetched while the caller still works on the first one
+    assert second_page_requested.wait(timeout=5)
+    assert list(results) == [2, 3, 4, 5]
+    assert [kw['json'] for _args, kw in mock_copy.call_args_list] == [
+        {}, {'start_cursor': 'c1'}, {'start_cursor': 'c2'},
+    ]
+
+
+def test_paginate_prefetch_close_early(mocker):
+    import time
+    from itertools import islice
+    from notion_params import Client
+    client = Client(rate_limit=None, prefetch=2)
+    client._session.request.return_value.json.side_effect = lambda: {
+        'results': list(range(100)), 'next_cursor': 'more',  # never ends
+    }
+    assert list(islice(client.list_users(), 3)) == [0, 1, 2]
+    # background thread stops after buffer is full and consumer is gone
+    time.sleep(0.3)
+    calls = len(client._session.request.call_args_list)
+    time.sleep(0.3)
+    assert len(client._session.request.call_args_list) == calls <= 4
+
+
+def test_paginate_prefetch_error(mocker):
+    import requests
+    from notion_params import Client
+    client = Client(rate_limit=None, prefetch=1)
+    client._session.request.return_value.raise_for_status.side_effect = [None, http_error(400)]
+    client._session.request.return_value.json.side_effect = [{'results': [1], 'next_cursor': 'c1'}]
+    results = client.search()
+    assert next(results) == 1
+    with pytest.raises(requests.exceptions.HTTPError):
+        next(results)
+
+
+def mock_block_children(client, tree):
+    """tree is {block_id: [child ids]}, mock retrieve_block_children() responses"""
+    def request(url, method, json):
+        block_id = url.split('/')[-2]
+        response = unittest.mock.Mock()
+        response.json.return_value = {
+            'results': [
+                {'id': i, 'type': 'paragraph', 'paragraph': {}, 'has_children': bool(tree.get(i))}
+                for i in tree[block_id]
+            ],
+        }
+        return response
+    client._session.request.side_effect = request
+
+
+def test_iter_block_tree():
+    from notion_params import Client
+    client = Client(rate_limit=None)
+    tree = {
+        'page': ['a', 'b', 'c'],
+        'a': ['a1', 'a2'],
+        'c': ['c1'],
+        'c1': ['c11'],
+    }
+    mock_block_children(client, tree)
+    result = [(depth, parent_id, block['id']) for depth, parent_id, block in client.iter_block_tree('page', workers=3)]
+    assert sorted(result) == sorted([
+        (1, 'page', 'a'), (1, 'page', 'b'), (1, 'page', 'c'),
+        (2, 'a', 'a1'), (2, 'a', 'a2'), (2, 'c', 'c1'),
+        (3, 'c1', 'c11'),
+    ])
+    # parent always comes before children
+    ids = [i[2] for i in result]
+    for depth, parent_id, block_id in result:
+        if parent_id != 'page':
+            assert ids.index(parent_id) < ids.index(block_id)
+    assert len(client._session.request.call_args_list) == 4
+
+    # max_depth
+    client._session.request.reset_mock()
+    result = [block['id'] for _, _, block in client.iter_block_tree('page', max_depth=2)]
+    assert sorted(result) == ['a', 'a1', 'a2', 'b', 'c', 'c1']
+    assert len(client._session.request.call_args_list) == 3
+
+
+def test_retrieve_block_tree():
+    from notion_params import Client
+    client = Client(rate_limit=None)
+    mock_block_children(client, {
+        'page': ['a', 'b'],
+        'a': ['a1', 'a2'],
+        'a2': ['a21'],
+    })
+    result = client.retrieve_block_tree('page')
+
+    def simplify(blocks):
+        return [
+            (i['id'], simplify(i['paragraph'].get('children', [])))
+            for i in blocks
+        ]
+    assert simplify(result) == [
+        ('a', [('a1', []), ('a2', [('a21', [])])]),
+        ('b', []),
+    ]
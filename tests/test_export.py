@@ -0,0 +1,148 @@
+import io
+
+import pytest
+from notion_params import NotionParams as NP
+from notion_params import blocks_to_md
+
+
+def md(text):
+    return NP.md(text)
+
+
+@pytest.mark.parametrize('text', [
+    'a\n\nb\nc',
+    '# h\ntext\n\n## h2\n\n### h3 **b**',
+    '- a\n- b\n\n1. c\n2. d\n\npara\n- item',
+    '!!callout emoji=💡 color=red\ntext **b**\n\n!!todo checked=true\nitem\n\n!!toggle\nhidden\n\n!!todo\nnot done',
+    '> quote\n> more\n\nafter\n> q',
+    '```python\nx=1\n```\n\n```\nplain\n```\ntext\n\n```js\nlet a = "```";\n```',
+    '| a | b |\n| - | - |\n| 1 | 2 |\n\nafter',
+    'text\n\n---\n# h\n***',
+    "<span style='color:red'>red</span> and <span style='background-color:blue'>bg **bold**</span>",
+    '**a** b *c* ~~d~~ `e` [f](http://g) ***bi*** code with `` ` `` tick',
+    '![img](http://x/y.png)',
+])
+def test_round_trip(text):
+    assert md(blocks_to_md(md(text))) == md(text)
+
+
+def test_escape():
+    text = 'a * b _ c [x] ~z~ & | 1. - + # \\'
+    blocks = [{'type': 'paragraph', 'paragraph': {'rich_text': [{'text': {'content': text}}]}}]
+    result = md(blocks_to_md(blocks))
+    assert ''.join(i['text']['content'] for i in result[0]['paragraph']['rich_text']) == text
+    for line in ['- not a list', '# not a heading', '1. not a list', '!!callout']:
+        blocks = [{'type': 'paragraph', 'paragraph': {'rich_text': [{'text': {'content': line}}]}}]
+        result = md(blocks_to_md(blocks))
+        assert [i['type'] for i in result] == ['paragraph']
+        assert ''.join(i['text']['content'] for i in result[0]['paragraph']['rich_text']) == line
+
+
+def test_table_cells():
+    cells = ['my_var', 'a*b', '+3%', 'a|b', '- x', '1. y', '[z]', 'x\\y', '**not bold**', '<b>']
+    rows = [{'type': 'table_row', 'table_row': {'cells': [[{'text': {'content': cell}}] for cell in cells]}}] * 2
+    blocks = [{'type': 'table', 'table': {'table_width': len(cells), 'children': rows}}]
+    result = md(blocks_to_md(blocks))
+    assert [
+        ''.join(i['text']['content'] for i in cell)
+        for cell in result[0]['table']['children'][1]['table_row']['cells']
+    ] == cells
+
+
+def rich_text(content, **annotations):
+    # API format, https://developers.notion.com/reference/rich-text
+    return {
+        'type': 'text',
+        'text': {'content': content, 'link': None},
+        'annotations': {
+            'bold': False, 'italic': False, 'strikethrough': False, 'underline': False, 'code': False,
+            'color': 'default', **annotations,
+        },
+        'plain_text': content,
+        'href': None,
+    }
+
+
+def block(id, type_, *texts, has_children=False, **kw):
+    return {
+        'object': 'block',
+        'id': id,
+        'type': type_,
+        'has_children': has_children,
+        type_: {'rich_text': list(texts), 'color': 'default', **kw},
+    }
+
+
+class FakeClient:
+    def __init__(self, children):
+        self.children = children
+        self.calls = []
+
+    def retrieve_block_children(self, block_id):
+        self.calls.append(block_id)
+        yield from self.children[block_id]
+
+
+def test_api_blocks_with_client():
+    client = FakeClient({
+        'list': [block('nested', 'bulleted_list_item', rich_text('nested'))],
+        'quote': [block('in-quote', 'paragraph', rich_text('inside'))],
+        'toggle': [block('in-toggle', 'paragraph', rich_text('hidden'))],
+        'table': [
+            {'type': 'table_row', 'table_row': {'cells': [[rich_text('k')], [rich_text('v')]]}},
+            {'type': 'table_row', 'table_row': {'cells': [[rich_text('1')], [rich_text('a|b')]]}},
+        ],
+    })
+    blocks = [
+        block('h', 'heading_2', rich_text('Title')),
+        block('p', 'paragraph', rich_text('plain '), rich_text('bold', bold=True), rich_text(' red', color='red')),
+        block('p2', 'paragraph', {'type': 'mention', 'plain_text': '@someone', 'href': None, 'annotations': {}}),
+        block('list', 'bulleted_list_item', rich_text('item'), has_children=True),
+        block('quote', 'quote', rich_text('said'), has_children=True),
+        block('toggle', 'toggle', rich_text('more'), has_children=True),
+        block('todo', 'to_do', rich_text('done'), checked=True),
+        block('code', 'code', rich_text('print(1)'), language='python'),
+        {'id': 'table', 'type': 'table', 'has_children': True, 'table': {'table_width': 2}},
+        {'id': 'img', 'type': 'image', 'has_children': False, 'image': {
+            'type': 'file', 'file': {'url': 'https://s3/x.png'}, 'caption': [rich_text('cap')]}},
+    ]
+    out = io.StringIO()
+    assert blocks_to_md(iter(blocks), out, client=client) is None
+    assert out.getvalue() == '\n'.join([
+        '## Title',
+        "plain **bold**<span style='color:red'> red</span>",
+        '',
+        '@someone',
+        '- item',
+        '  - nested',
+        '> said',
+        '>',
+        '> inside',
+        '',
+        '!!toggle',
+        'more',
+        '',
+        'hidden',
+        '',
+        '!!todo checked=true',
+        'done',
+        '```python',
+        'print(1)',
+        '```',
+        '| k | v |',
+        '| --- | --- |',
+        '| 1 | a\\|b |',
+        '',
+        '![cap](https://s3/x.png)',
+        '',
+    ])
+    assert client.calls == ['list', 'quote', 'toggle', 'table']
+    # without client, children are not fetched
+    assert '- nested' not in blocks_to_md(blocks)
+
+
+def test_nested_children():
+    # children nested in blocks, eg Client.retrieve_block_tree()
+    blocks = md('- a')
+    blocks[0]['bulleted_list_item']['children'] = md('1. b\n\n```\ncode\n```')
+    assert blocks_to_md(blocks) == '- a\n  1. b\n\n  ```\n  code\n  ```\n'
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+import requests
+
+from notion_params import AsyncClient, Client
+from notion_params import NotionParams as NP
+from notion_params.fake_server import FakeNotionServer
+
+
+@pytest.fixture
+def server():
+    with FakeNotionServer() as server:
+        yield server
+
+
+@pytest.fixture
+def notion(server):
+    return Client('token', rate_limit=None, base_url=server.url)
+
+
+def test_pages_and_blocks(server, notion):
+    page = notion.create_page(**NP.create_page(server.root_page_id, title='report', text='# title\n\ntext'))
+    assert notion.retrieve_page(page['id'])['id'] == page['id']
+    blocks = list(notion.retrieve_block_children(page['id']))
+    assert [i['type'] for i in blocks] == ['heading_1', 'paragraph', 'paragraph']
+    assert blocks[0]['heading_1']['rich_text'][0]['plain_text'] == 'title'
+    # pagination, 250 blocks in 3 pages
+    for i in range(0, 250, 100):
+        notion.append_block_children(page['id'], children=NP.md('\n'.join(f'- {j}' for j in range(i, min(i + 100, 250)))))
+    server.requests.clear()
+    assert len(list(notion.retrieve_block_children(page['id']))) == 253
+    assert len(server.requests) == 3
+    # insert, update, delete
+    first = blocks[0]['id']
+    notion.append_block_children(page['id'], children=NP.md('inserted'), after=first)
+    notion.update_block(first, heading_1={'rich_text': [{'text': {'content': 'new title'}}]})
+    notion.delete_block(blocks[1]['id'])
+    blocks = list(notion.retrieve_block_children(page['id'], page_size=3))
+    assert [i['type'] for i in blocks[:3]] == ['heading_1', 'paragraph', 'paragraph']
+    assert blocks[0]['heading_1']['rich_text'][0]['plain_text'] == 'new title'
+    assert blocks[1]['paragraph']['rich_text'][0]['plain_text'] == 'inserted'
+    assert [i['id'] for i in notion.search(query='REP')] == [page['id']]
+    assert notion.retrieve_bot_user()['type'] == 'bot'
+    assert len(list(notion.list_users())) == 1
+
+
+def test_database(server, notion):
+    db = notion.create_database(**NP.create_database(server.root_page_id, title='db', columns=['k', 'v']))
+    assert notion.retrieve_database(db['id'])['properties']['k']['type'] == 'title'
+    for i in range(5):
+        notion.create_page(**NP.create_database_row(db['id'], row={'k': i, 'v': f'value {i}'}))
+    rows = list(notion.query_database(db['id'], page_size=2))
+    assert [row['properties']['k']['title'][0]['text']['content'] for row in rows] == ['0', '1', '2', '3', '4']
+    items = list(notion.retrieve_page_property_item(rows[0]['id'], 'v'))
+    assert items[0]['rich_text']['text']['content'] == 'value 0'
+
+
+def test_errors(server, notion, mocker):
+    sleep = mocker.patch('notion_params.client.time.sleep')
+    server.inject(429, retry_after=0.5)
+    server.inject(502, times=2)
+    assert notion.retrieve_bot_user()['type'] == 'bot'
+    assert [call.args[0] for call in sleep.call_args_list] == [0.5, 2, 2]
+    assert server.stats()['statuses'] == {429: 1, 502: 2, 200: 1}
+    with pytest.raises(requests.HTTPError) as exc_info:
+        notion.retrieve_page('00000000-0000-0000-0000-000000000000')
+    assert exc_info.value.response.json()['code'] == 'object_not_found'
+    # API limit
+    with pytest.raises(requests.HTTPError):
+        notion.append_block_children(server.root_page_id, children=NP.md('\n'.join(f'- {i}' for i in range(101))))
+
+
+def test_rate_limit(mocker):
+    with FakeNotionServer(rate_limit=10, burst=2) as server:
+        sleep = mocker.patch('notion_params.client.time.sleep')
+        notion = Client(rate_limit=None, base_url=server.url)
+        for _ in range(3):
+            notion.retrieve_bot_user()
+        assert server.stats()['statuses'][429] >= 1
+        assert 0 < sleep.call_args.args[0] <= 0.1
+
+
+def test_connection_reuse(server, notion):
+    for _ in range(5):
+        notion.retrieve_bot_user()
+    assert server.stats()['connections'] == 1
+
+
+def test_async_client():
+    async def main():
+        async with AsyncClient(rate_limit=None, base_url=server.url) as notion:
+            pages = await asyncio.gather(*(
+                notion.create_page(**NP.create_page(server.root_page_id, title=f'page {i}'))
+                for i in range(10)
+            ))
+            found = [i async for i in notion.search(page_size=3)]
+            return pages, found
+    with FakeNotionServer(latency=0.02) as server:
+        pages, found = asyncio.run(main())
+        assert len(found) == 11  # root page too
+        assert server.stats()['max_in_flight'] > 1
@@ -24,6 +24,13 @@ def test_decode_style():
     assert decode_style("""<span style='background-color:blue'>""") == 'blue_background'
     assert decode_style("""<span style='color:pink'>""") == 'pink'
     assert decode_style("""<span style='color:cyanic'>""") == 'blue'  # unsupported color
+    # multiple declarations, last color wins
+    assert decode_style("""<span style='font-weight:bold; color:red'>""") == 'red'
+    assert decode_style("""<span style="color: red ;background-color : gray">""") == 'gray_background'
+    assert decode_style("""<span class='x' style=color:green>""") == 'green'
+    assert decode_style("""<span data-style='color:red'>""") == ''
+    assert decode_style("""<SPAN STYLE='COLOR:RED'>""") == 'red'
+    assert decode_style("""</span >""") == '/'
 
 
 def test_basic():
@@ -374,4 +381,173 @@ Next line
 """)
     print(json.dumps(result, indent=4))
     assert False, 'TODO'
- 
\ No newline at end of file
+ 
+
+def test_md_cache():
+    from notion_params import disable_md_cache, enable_md_cache
+    cache = enable_md_cache(maxsize=2)
+    try:
+        text = '# title\n\n**bold** text'
+        first = md(text)
+        assert cache.info()['misses'] == 1
+        second = md(text)
+        assert second == first and cache.info()['hits'] == 1
+        # every hit returns a new copy
+        second[0]['heading_1']['rich_text'][0]['text']['content'] = 'changed'
+        assert md(text) == first
+        assert NP.md_line('title') == [{'text': {'content': 'title'}}]
+        # lru eviction by size
+        md('a')
+        md('b')
+        assert cache.info()['size'] == 2
+        md(text)
+        assert cache.info()['misses'] == 5
+        # errors are not cached
+        with pytest.raises(NotImplementedError):
+            md('#### heading 4 will fail')
+        cache.clear()
+        assert cache.info() == {'hits': 0, 'misses': 0, 'size': 0, 'bytes': 0}
+    finally:
+        disable_md_cache()
+
+
+def test_md_cache_bytes():
+    cache = notion_params.markdown.MarkdownCache(maxsize=100, maxbytes=200)
+    for i in range(10):
+        cache.put(i, [{'text': {'content': 'x' * 50}}])
+    assert cache.bytes <= 200 and cache.info()['size'] == 2
+    assert cache.get(9) == [{'text': {'content': 'x' * 50}}]
+    assert cache.get(0) is None
+    # too large to cache
+    cache.put('big', ['x' * 500])
+    assert cache.get('big') is None
+    # bytes of utf-8, 70 characters of 3 bytes don't fit in 200
+    cache.clear()
+    cache.put('wide', ['字' * 70])
+    assert cache.get('wide') is None
+    cache.put('ascii', ['x' * 60])
+    assert cache.info()['bytes'] == len(json.dumps(['x' * 60]))
+
+
+@pytest.mark.parametrize('text', [
+    'a\n\nb',
+    '\n\nb\n\n',
+    'x\n\n\n\n\n',
+    '- x\n- y\n\n- z\n\nafter',
+    '1. a\n\n\n\nb\n\n* c\n\n\nd',
+    '```\ncode\n\nmore\n```\n\npara',
+    '~~~\n```\n\n~~~\nx',
+    '<!-- comment\n\nstill comment -->\n\npara',
+    '> q\n>\n>> inner\n\n> q2\n\ntext\n\n    indented\n\n    code\nx',
+    '# h\n\n| a | b |\n| - | - |\n| 1 | 2 |\n\n!!callout emoji=X\ntext\n\nend',
+    "text `code` <span style='color:red'>red</span>\n\n- [a](http://x)\n",
+])
+def test_md_iter_same_as_md(text):
+    assert list(NP.md_iter(text)) == md(text)
+
+
+@pytest.mark.parametrize('text', [
+    '# a\n\npara one\n\npara two',
+    '```\ncode\n\nmore\n```\n\n- a\n\n- b\n',
+])
+def test_md_iter_lines_without_endings(text):
+    assert list(NP.md_iter(text.splitlines())) == md(text)
+
+
+def test_md_iter_streaming():
+    import io
+
+    def lines():
+        yield '# title\n'
+        yield '\n'
+        yield 'first paragraph\n'
+        yield '\n'
+        yield 'second\n'
+        raise RuntimeError('not read yet')
+    blocks = NP.md_iter(lines())
+    assert next(blocks)['type'] == 'heading_1'
+    assert next(blocks)['paragraph']['rich_text'] == [{'text': {'content': ''}}]
+    assert next(blocks)['paragraph']['rich_text'] == [{'text': {'content': 'first paragraph'}}]
+    # file object
+    assert list(NP.md_iter(io.StringIO('a\n\nb\n'))) == md('a\n\nb\n')
+
+
+@pytest.mark.parametrize('executor', ['process', 'thread'])
+def test_md_many(executor):
+    texts = [f'# doc {i}\n\n- item **{i}**\n\n' + 'text ' * i for i in range(20)]
+    assert list(NP.md_many(iter(texts), workers=2, executor=executor, chunksize=3)) == [md(i) for i in texts]
+    assert list(NP.md_many([], executor=executor)) == []
+
+
+def test_md_many_stops_early():
+    def texts():
+        yield 'a'
+        yield 'b'
+        raise RuntimeError('read too far')
+    blocks = NP.md_many(texts(), workers=1, executor='thread')
+    assert next(blocks) == md('a')
+    blocks.close()
+    # raised at the call, not on first next()
+    with pytest.raises(ValueError):
+        NP.md_many(['a'], executor='fork')
+
+
+def test_split_long_text():
+    result = md('```python\n' + 'x' * 4500 + '\n```')
+    assert result == [{
+        "type": "code",
+        "code": {
+            "rich_text": [
+                {"text": {"content": 'x' * 2000}},
+                {"text": {"content": 'x' * 2000}},
+                {"text": {"content": 'x' * 500 + '\n'}},
+            ],
+            "language": "python",
+        }
+    }]
+
+    result = md('start [' + 'y' * 2500 + '](http://x.com) **' + 'b' * 2001 + '**')
+    assert result[0]['paragraph']['rich_text'] == [
+        {"text": {"content": "start "}},
+        {"text": {"content": 'y' * 2000, "link": {"url": "http://x.com"}}},
+        {"text": {"content": 'y' * 500, "link": {"url": "http://x.com"}}},
+        {"text": {"content": " "}},
+        {"text": {"content": 'b' * 2000}, "annotations": {"bold": True}},
+        {"text": {"content": 'b'}, "annotations": {"bold": True}},
+    ]
+    # parts don't share dicts
+    parts = result[0]['paragraph']['rich_text']
+    assert parts[1]['text']['link'] is not parts[2]['text']['link']
+    assert parts[4]['annotations'] is not parts[5]['annotations']
+
+    # colored long text
+    result = md("<span style='color:red'>" + 'z' * 2001 + "</span>")
+    assert result[0]['paragraph']['rich_text'] == [
+        {"text": {"content": 'z' * 2000}, "annotations": {"color": "red"}},
+        {"text": {"content": 'z'}, "annotations": {"color": "red"}},
+    ]
+
+    # table cell
+    result = md('| a |\n| - |\n| ' + 'c' * 2001 + ' |')
+    assert result[0]['table']['children'][1]['table_row']['cells'] == [
+        [{"text": {"content": 'c' * 2000}}, {"text": {"content": 'c'}}],
+    ]
+
+
+def test_split_long_rich_text():
+    text = ' '.join(f'**{i}**' for i in range(75))  # 149 text objects
+    result = md(text)
+    assert [i['type'] for i in result] == ['paragraph', 'paragraph']
+    rich_text = result[0]['paragraph']['rich_text'] + result[1]['paragraph']['rich_text']
+    assert len(result[0]['paragraph']['rich_text']) == 100
+    assert ''.join(i['text']['content'] for i in rich_text) == ' '.join(str(i) for i in range(75))
+
+    result = md('- ' + text + '\n- item 2')
+    assert [i['type'] for i in result] == ['bulleted_list_item'] * 3
+    assert result[2]['bulleted_list_item']['rich_text'] == [{"text": {"content": "item 2"}}]
+
+    # children stay with the last block
+    result = md('> ' + text + '\n>\n>> inner')
+    assert [i['type'] for i in result] == ['quote', 'quote']
+    assert 'children' not in result[0]['quote']
+    assert result[1]['quote']['children'][0]['type'] == 'quote'
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+import requests
+
+from notion_params import AsyncClient, Client, HistogramCollector, Hooks
+from notion_params.fake_server import FakeNotionServer
+from notion_params.metrics import endpoint_template
+
+
+class Recorder(Hooks):
+    def __init__(self):
+        self.events = []
+
+    def before(self, event):
+        self.events.append(('before', event.endpoint, event.attempt, event.status))
+
+    def after(self, event):
+        assert event.duration >= 0 and event.bytes_received > 0
+        self.events.append(('after', event.endpoint, event.attempt, event.status))
+
+    def retry(self, event):
+        self.events.append(('retry', event.endpoint, event.attempt, event.retry_delay))
+
+    def error(self, event):
+        self.events.append(('error', event.endpoint, event.attempt, type(event.error).__name__))
+
+
+@pytest.mark.parametrize('url, template', [
+    ('/v1/blocks/abc-123/children', '/v1/blocks/{block_id}/children'),
+    ('/v1/pages/p1/properties/title', '/v1/pages/{page_id}/properties/{property_id}'),
+    ('/v1/databases/d1/query', '/v1/databases/{database_id}/query'),
+    ('/v1/users/me', '/v1/users/me'),
+    ('/v1/users', '/v1/users'),
+    ('/v1/search', '/v1/search'),
+])
+def test_endpoint_template(url, template):
+    assert endpoint_template(url) == template
+
+
+def test_hooks(mocker):
+    mocker.patch('notion_params.client.time.sleep')
+    recorder = Recorder()
+    metrics = HistogramCollector(buckets=(0.5, 1))
+    with FakeNotionServer() as server:
+        notion = Client(rate_limit=None, base_url=server.url, hooks=[recorder, metrics])
+        server.inject(429, retry_after=0.25)
+        notion.retrieve_page(server.root_page_id)
+        server.inject(502, times=3)
+        with pytest.raises(requests.HTTPError):
+            notion.retrieve_bot_user()
+    page = '/v1/pages/{page_id}'
+    me = '/v1/users/me'
+    assert recorder.events == [
+        ('before', page, 1, None), ('after', page, 1, 429), ('retry', page, 1, 0.25),
+        ('before', page, 2, None), ('after', page, 2, 200),
+        ('before', me, 1, None), ('after', me, 1, 502), ('retry', me, 1, 2),
+        ('before', me, 2, None), ('after', me, 2, 502), ('retry', me, 2, 2),
+        ('before', me, 3, None), ('after', me, 3, 502), ('error', me, 3, 'HTTPError'),
+    ]
+    snapshot = metrics.snapshot()
+    assert snapshot['duration'][('get', me, '502')]['count'] == 3
+    assert snapshot['duration'][('get', page, '200')]['buckets'] == {0.5: 1, 1: 1, float('inf'): 1}
+    assert snapshot['counters'][('retries', 'get', me, '502')] == 2
+    assert snapshot['counters'][('errors', 'get', me, '502')] == 1
+    text = metrics.openmetrics()
+    assert '# TYPE notion_request_duration_seconds histogram' in text
+    assert 'notion_request_duration_seconds_bucket{method="get",endpoint="/v1/users/me",status="502",le="+Inf"} 3' in text
+    assert 'notion_request_retries_total{method="get",endpoint="/v1/pages/{page_id}",status="429"} 1' in text
+    assert 'notion_request_retry_delay_seconds_total{method="get",endpoint="/v1/pages/{page_id}",status="429"} 0.25' in text
+    assert text.endswith('# EOF\n')
+
+
+def test_hooks_connection_error():
+    recorder = Recorder()
+    # nothing listens on port 9 (discard) of localhost
+    notion = Client(rate_limit=None, base_url='http://127.0.0.1:9', hooks=recorder)
+    with pytest.raises(requests.ConnectionError):
+        notion.retrieve_bot_user()
+    assert recorder.events == [('before', '/v1/users/me', 1, None), ('error', '/v1/users/me', 1, 'ConnectionError')]
+
+
+def test_broken_hook():
+    class Broken(Hooks):
+        def after(self, event):
+            raise RuntimeError('bug')
+    with FakeNotionServer() as server:
+        notion = Client(rate_limit=None, base_url=server.url, hooks=Broken())
+        with pytest.warns(UserWarning, match='Broken.after failed'):
+            assert notion.retrieve_bot_user()['type'] == 'bot'
+
+
+def test_async_hooks():
+    metrics = HistogramCollector()
+
+    async def main():
+        async with AsyncClient(rate_limit=None, base_url=server.url, hooks=metrics) as notion:
+            await asyncio.gather(*(notion.retrieve_bot_user() for _ in range(3)))
+    with FakeNotionServer() as server:
+        asyncio.run(main())
+    snapshot = metrics.snapshot()
+    assert snapshot['duration'][('get', '/v1/users/me', '200')]['count'] == 3
+    assert snapshot['wait'][('get', '/v1/users/me')]['count'] == 3
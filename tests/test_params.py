@@ -170,3 +170,47 @@ def test_find_child():
         type_='child_database',
         title='db name',
     )
+
+
+def test_table_df_rows_types():
+    df = pd.DataFrame({
+        'i': [1, 2],
+        'f': [1.5, float('nan')],
+        'o': pd.Series(['a', None], dtype=object),
+        't': pd.to_datetime(['2022-01-02 00:00', '2022-01-03 04:05']),
+    })
+    expected = [
+        ['1', '1.5', 'a', '2022-01-02 00:00:00'],
+        ['2', 'nan', 'None', '2022-01-03 04:05:00'],
+    ]
+
+    def cells(result):
+        return [[cell[0]['text']['content'] for cell in row['table_row']['cells']] for row in result]
+    assert cells(NP.table_df_rows(df)) == expected
+    assert NP.table_df_rows(df[:0]) == []
+    # list of tuples
+    assert cells(NP.table_df_rows([(1, 1.5, 'a'), (2, 'x', None)])) == [['1', '1.5', 'a'], ['2', 'x', 'None']]
+    # pyarrow Table
+    pa = pytest.importorskip('pyarrow')
+    table = pa.table({'i': [1, 2], 'o': ['a', None]})
+    assert cells(NP.table_df_rows(table)) == [['1', 'a'], ['2', 'None']]
+
+
+def test_lazy_import():
+    import subprocess
+    import sys
+    code = '''
+import sys
+import notion_params
+from notion_params import NotionParams as NP
+assert not {'marko', 'requests', 'httpx', 'pandas'} & set(sys.modules), sorted(sys.modules)
+assert NP.md_line('x') == [{'text': {'content': 'x'}}]
+assert 'marko' in sys.modules and 'requests' not in sys.modules
+from notion_params import Client, md
+assert notion_params.md is md and 'md_many' in dir(notion_params)
+assert not {'asyncio', 'sqlite3'} & set(sys.modules), 'not needed by Client'
+'''
+    subprocess.run([sys.executable, '-c', code], check=True)
+    import notion_params
+    with pytest.raises(AttributeError):
+        notion_params.no_such_name
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+
+from notion_params.ratelimit import FileRateLimiter, RateLimiter
+
+
+def test_burst_then_wait(mocker):
+    now = mocker.patch('time.monotonic', return_value=100.0)
+    limiter = RateLimiter(rate=3)
+    # full bucket allows a burst of 3
+    assert [limiter.reserve() for _ in range(3)] == [0, 0, 0]
+    # then each request reserves the next slot
+    assert limiter.reserve() == pytest.approx(1 / 3)
+    assert limiter.reserve() == pytest.approx(2 / 3)
+    # refilled after time passes
+    now.return_value = 102.0
+    assert limiter.reserve() == 0
+
+
+def test_invalid_rate():
+    with pytest.raises(ValueError):
+        RateLimiter(rate=0)
+
+
+def test_shared_by_threads(mocker):
+    mocker.patch('time.monotonic', return_value=100.0)
+    limiter = RateLimiter(rate=10, burst=1)
+    delays = []
+
+    def worker():
+        for _ in range(5):
+            delays.append(limiter.reserve())
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # every reservation gets a unique slot, 0.1s apart
+    assert sorted(round(i, 6) for i in delays) == [round(i / 10, 6) for i in range(20)]
+
+
+def test_file_limiter_shared_by_instances(tmp_path, mocker):
+    mocker.patch('time.time', return_value=1000.0)
+    path = str(tmp_path / 'ratelimit')
+    # two instances simulate two processes
+    a = FileRateLimiter(path, rate=2)
+    b = FileRateLimiter(path, rate=2)
+    assert a.reserve() == 0
+    assert b.reserve() == 0
+    assert a.reserve() == pytest.approx(0.5)
+    assert b.reserve() == pytest.approx(1.0)
+
+
+def test_client_acquires_before_request(mocker):
+    mocker.patch('requests.Session')
+    from notion_params import Client
+    limiter = mocker.Mock()
+    client = Client(limiter=limiter)
+    client.retrieve_page('abc')
+    client.retrieve_block('abc')
+    assert limiter.acquire.call_count == 2
+
+
+def test_client_default_limiter(mocker):
+    mocker.patch('requests.Session')
+    from notion_params import Client
+    assert Client()._limiter.rate == 3
+    assert Client(rate_limit=10)._limiter.rate == 10
+    assert Client(rate_limit=None)._limiter is None
+
+
+def test_client_throttled(mocker):
+    mocker.patch('requests.Session')
+    from notion_params import Client
+    client = Client(rate_limit=20)
+    start = time.monotonic()
+    for _ in range(25):
+        client.retrieve_page('abc')
+    # 20 burst + 5 at 20/s
+    assert time.monotonic() - start >= 0.2
+
+
+def test_retry_delay():
+    from notion_params.ratelimit import retry_delay
+    assert retry_delay(429, 1, '3') == 3
+    assert retry_delay(429, 1, '0.5') == 0.5
+    assert [retry_delay(429, i) for i in range(1, 7)] == [1, 2, 4, 8, 10, 10]
+    assert retry_delay(429, 1, 'Wed, 21 Oct 2015 07:28:00 GMT') == 0  # date in the past
+    assert retry_delay(429, 2, 'not a date') == 2
+    assert [retry_delay(502, i) for i in range(1, 4)] == [2, 2, None]
+    assert retry_delay(400, 1) is None
+    assert retry_delay(500, 1, '3') is None
+
+
+def test_adaptive_concurrency_aimd(mocker):
+    from notion_params.ratelimit import AdaptiveConcurrency
+    now = mocker.patch('time.monotonic', return_value=100.0)
+    concurrency = AdaptiveConcurrency(initial=4, minimum=1, maximum=6)
+    assert [concurrency.try_acquire() for _ in range(5)] == [True] * 4 + [False]
+    concurrency.release(429)
+    assert concurrency.limit == 2
+    concurrency.release(502)  # in cooldown, counted as the same signal
+    assert concurrency.limit == 2
+    now.return_value = 102.0
+    concurrency.release(429)
+    assert concurrency.limit == 1
+    concurrency.release(None)  # no response, limit unchanged
+    assert concurrency.limit == 1 and concurrency.in_flight == 0
+    # additive increase, about +1 per window of successes
+    for _ in range(10):
+        assert concurrency.try_acquire()
+        concurrency.release(200)
+    assert 4 < concurrency.limit < 5
+    for _ in range(100):
+        concurrency.try_acquire()
+        concurrency.release(200)
+    assert concurrency.limit == 6
+
+
+def test_adaptive_concurrency_blocks_threads():
+    from notion_params.ratelimit import AdaptiveConcurrency
+    concurrency = AdaptiveConcurrency(initial=2, maximum=2)
+    peak = []
+    lock = threading.Lock()
+
+    def worker():
+        concurrency.acquire()
+        with lock:
+            peak.append(concurrency.in_flight)
+        time.sleep(0.01)
+        concurrency.release(200)
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(peak) <= 2 and concurrency.in_flight == 0
+
+
+def test_adaptive_concurrency_async():
+    import asyncio
+    from notion_params.ratelimit import AdaptiveConcurrency
+    concurrency = AdaptiveConcurrency(initial=3, maximum=3)
+    peak = []
+
+    async def worker():
+        await concurrency.acquire_async(poll=0.001)
+        peak.append(concurrency.in_flight)
+        await asyncio.sleep(0.01)
+        concurrency.release(200)
+
+    async def run():
+        await asyncio.gather(*(worker() for _ in range(10)))
+    asyncio.run(run())
+    assert max(peak) <= 3 and concurrency.in_flight == 0
+
+
+def test_invalid_concurrency():
+    from notion_params.ratelimit import AdaptiveConcurrency
+    with pytest.raises(ValueError):
+        AdaptiveConcurrency(initial=10, maximum=5)
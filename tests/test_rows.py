@@ -0,0 +1,157 @@
+import json
+from collections import namedtuple
+
+import pandas as pd
+import pytest
+import requests
+from notion_params import NotionParams as NP
+from notion_params import RowSerializer
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame([
+        {'k': 1, 'v1': 'a', 'v2': 10},
+        {'k': 2, 'v1': 'b', 'v2': 11},
+    ])
+
+
+def test_same_as_create_database_row(df):
+    serializer = RowSerializer.from_columns(df.columns)
+    for _, row in df.iterrows():
+        assert serializer.create_database_row('abc', row, emoji='X') == \
+            NP.create_database_row('abc', row=row, emoji='X')
+
+
+def test_row_types(df):
+    serializer = RowSerializer.from_columns(['k', 'v2'], column_types={'v2': 'number'})
+    expected = {
+        'k': {'type': 'title', 'title': [{'text': {'content': '1'}}]},
+        'v2': {'type': 'number', 'number': 10},
+    }
+    assert serializer.properties({'k': 1, 'v1': 'a', 'v2': 10}) == expected
+    Row = namedtuple('Row', 'k v1 v2')
+    assert serializer.properties(Row(1, 'a', 10)) == expected
+    assert list(serializer.serialize(df)) == [expected, {
+        'k': {'type': 'title', 'title': [{'text': {'content': '2'}}]},
+        'v2': {'type': 'number', 'number': 11},
+    }]
+    assert list(serializer.serialize(df[:0])) == []
+
+
+def test_from_database():
+    # part of https://developers.notion.com/reference/retrieve-a-database
+    database = {
+        'object': 'database',
+        'properties': {
+            'Name': {'id': 'title', 'name': 'Name', 'type': 'title', 'title': {}},
+            'Description': {'id': 'J@cS', 'name': 'Description', 'type': 'rich_text', 'rich_text': {}},
+            'In stock': {'id': '{xY`', 'name': 'In stock', 'type': 'checkbox', 'checkbox': {}},
+        },
+    }
+    serializer = RowSerializer.from_database(database)
+    assert serializer.column_types == {'Name': 'title', 'Description': 'rich_text', 'In stock': 'checkbox'}
+    assert serializer.properties({'Description': 'd', 'In stock': True, 'Name': 'n'}) == {
+        'Name': {'type': 'title', 'title': [{'text': {'content': 'n'}}]},
+        'Description': {'type': 'rich_text', 'rich_text': [{'text': {'content': 'd'}}]},
+        'In stock': {'type': 'checkbox', 'checkbox': True},
+    }
+
+
+def test_converters():
+    serializer = RowSerializer({
+        'n': 'number', 's': 'select', 'm': 'multi_select', 'd': 'date', 'c': 'checkbox',
+        'u': 'url', 'e': 'email', 'p': 'people', 'r': 'relation',
+    })
+    row = {
+        'n': '1.5', 's': 'a', 'm': 'a, b', 'd': pd.Timestamp('2022-01-02'), 'c': 'yes',
+        'u': 'https://x.com', 'e': '', 'p': ['u1'], 'r': 'p1,p2',
+    }
+    assert {k: v[v['type']] for k, v in serializer.properties(row).items()} == {
+        'n': 1.5, 's': {'name': 'a'}, 'm': [{'name': 'a'}, {'name': 'b'}], 'd': {'start': '2022-01-02T00:00:00'},
+        'c': True, 'u': 'https://x.com', 'e': None, 'p': [{'object': 'user', 'id': 'u1'}], 'r': [{'id': 'p1'}, {'id': 'p2'}],
+    }
+    # empty values of a DataFrame
+    df = pd.DataFrame([{k: None for k in row}, {'n': 2, 's': {'name': 'x'}, 'd': ('2022-01-01', '2022-01-03'), 'c': 0}])
+    empty, values = [{k: v[v['type']] for k, v in i.items()} for i in serializer.serialize(df)]
+    assert empty == {'n': None, 's': None, 'm': [], 'd': None, 'c': False, 'u': None, 'e': None, 'p': [], 'r': []}
+    assert type(values['n']) is float and values['s'] == {'name': 'x'} and values['c'] is False
+    assert values['d'] == {'start': '2022-01-01', 'end': '2022-01-03'}
+    # empty cells of a csv
+    blank = {k: v[v['type']] for k, v in serializer.properties({k: ' ' if k == 'd' else '' for k in row}).items()}
+    assert blank == empty
+    assert serializer.properties({**row, 'n': '1,234.5'})['n']['number'] == 1234.5
+
+
+def test_null_values():
+    serializer = RowSerializer({
+        't': 'title', 'x': 'rich_text', 'n': 'number', 's': 'select', 'c': 'checkbox', 'd': 'date',
+    })
+    df = pd.DataFrame([
+        {'t': 'a', 'x': 'b', 'n': 1, 's': 'x', 'c': True, 'd': pd.Timestamp('2022-01-02')},
+        {'t': None, 'x': float('nan'), 'n': None, 's': None, 'c': None, 'd': None},
+    ])
+    expected = {'t': [], 'x': [], 'n': None, 's': None, 'c': False, 'd': None}
+    # object columns with None/NaN, nullable dtypes with pd.NA
+    for frame in (df, df.convert_dtypes()):
+        values, empty = [{k: v[v['type']] for k, v in i.items()} for i in serializer.serialize(frame)]
+        assert empty == expected
+        assert values['n'] == 1 and values['c'] is True and values['t'] == [{'text': {'content': 'a'}}]
+        json.dumps(list(serializer.serialize(frame)))
+        for _, row in frame.iterrows():
+            json.dumps(serializer.properties(row))
+    assert serializer.properties({'t': pd.NA, 'x': '', 'n': pd.NA, 's': pd.NA, 'c': pd.NA, 'd': pd.NaT}) == {
+        k: {'type': type_, type_: expected[k]} for k, type_ in serializer.column_types.items()
+    }
+
+
+def test_database_writer():
+    from notion_params import Client, DatabaseWriter
+    from notion_params.fake_server import FakeNotionServer
+    with FakeNotionServer() as server:
+        notion = Client('token', rate_limit=None, base_url=server.url)
+        db = notion.create_database(**NP.create_database(
+            server.root_page_id, title='db', columns=['name', 'price', 'tags', 'done'],
+            column_types={'price': 'number', 'tags': 'multi_select', 'done': 'checkbox'},
+        ))
+        writer = DatabaseWriter(notion, db['id'])
+        df = pd.DataFrame([{'name': f'n{i}', 'price': i / 2, 'tags': 'a,b', 'done': i % 2} for i in range(3)])
+        server.requests.clear()
+        for _, row in df.iterrows():
+            writer.create(row)
+        assert [method for method, _path, _status in server.requests] == ['GET', 'POST', 'POST', 'POST']
+        page = list(notion.query_database(db['id']))[-1]
+        assert page['properties']['price']['number'] == 1.0
+        assert page['properties']['tags']['multi_select'] == [{'name': 'a'}, {'name': 'b'}]
+        # column changed type in notion, schema is read again once
+        notion.update_database(db['id'], properties={'done': {'select': {}}})
+        server.requests.clear()
+        writer.create({'name': 'x', 'price': 1, 'tags': '', 'done': 'yes'})
+        assert [method for method, _path, _status in server.requests] == ['POST', 'GET', 'POST']
+        assert writer.refreshes == 1
+        assert list(notion.query_database(db['id']))[-1]['properties']['done']['select'] == {'name': 'yes'}
+        # empty cells
+        writer.create({'name': 'y', 'price': '', 'tags': ' ', 'done': ''})
+        with pytest.raises(KeyError, match='other'):
+            DatabaseWriter(notion, db['id']).create({'name': 'x', 'other': 1})
+
+
+def test_database_writer_bad_value(mocker):
+    from notion_params import DatabaseWriter
+    response = mocker.Mock(status_code=400)
+    response.json.return_value = {'object': 'error', 'status': 400, 'code': 'validation_error'}
+    client = mocker.Mock()
+    client.retrieve_database.return_value = {'id': 'db', 'properties': {
+        'name': {'id': 'title', 'type': 'title', 'title': {}},
+        'url': {'id': 'a1', 'type': 'url', 'url': {}},
+    }}
+    client.create_page.side_effect = requests.exceptions.HTTPError(response=response)
+    writer = DatabaseWriter(client, 'db')
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.HTTPError):
+            writer.create({'name': 'x', 'url': 'not a url'})
+    # schema didn't change, the row isn't sent again, and the schema is read again once
+    assert client.create_page.call_count == 3
+    assert client.retrieve_database.call_count == 2
+    assert writer.refreshes == 1
+    client.invalidate_cache.assert_called_once_with('db')
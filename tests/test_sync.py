@@ -0,0 +1,116 @@
+from itertools import count
+
+import pytest
+
+from notion_params import NotionParams as NP
+from notion_params import sync_markdown
+from notion_params.sync import _payload
+
+
+class FakePage:
+    """in memory page, blocks come back in API format, with has_children and ids"""
+
+    def __init__(self):
+        self.ids = count(1)
+        self.children = {}  # block_id -> [block]
+        self.calls = []
+
+    def _create(self, block):
+        type_ = block['type']
+        children = block[type_].get('children') or []
+        new_block = {'object': 'block', 'id': f'b{next(self.ids)}', 'type': type_, 'has_children': bool(children),
+                     type_: {k: v for k, v in block[type_].items() if k != 'children'}}
+        self.children[new_block['id']] = [self._create(i) for i in children]
+        return new_block
+
+    def append_block_children(self, block_id, *, children, after=None):
+        self.calls.append(('append', len(children), after))
+        created = [self._create(i) for i in children]
+        blocks = self.children.setdefault(block_id, [])
+        idx = len(blocks) if after is None else [i['id'] for i in blocks].index(after) + 1
+        blocks[idx:idx] = created
+        return {'object': 'list', 'results': created}
+
+    def retrieve_block_children(self, block_id):
+        yield from self.children.get(block_id, [])
+
+    def update_block(self, block_id, **kw):
+        self.calls.append(('update', block_id))
+        block = next(i for i in self.children['page'] if i['id'] == block_id)
+        type_, = kw
+        assert type_ == block['type']
+        # fields not sent are kept, same as the API
+        block[type_] = {**block[type_], **kw[type_]}
+        return block
+
+    def delete_block(self, block_id):
+        self.calls.append(('delete', block_id))
+        self.children['page'] = [i for i in self.children['page'] if i['id'] != block_id]
+
+    def content(self, block_id='page'):
+        return [
+            [_payload(block), self.content(block['id'])]
+            for block in self.children.get(block_id, [])
+        ]
+
+
+def expected(text):
+    page = FakePage()
+    page.append_block_children('page', children=NP.md(text))
+    return page.content()
+
+
+TEXT = '# Status\n\n- api: ok\n- db: ok\n\n| k | v |\n| - | - |\n| a | 1 |\n\n!!todo\nrelease'
+
+
+@pytest.mark.parametrize('text, calls', [
+    (TEXT, []),
+    (TEXT.replace('db: ok', 'db: **down**'), [('update', 'b4')]),
+    (TEXT.replace('- db: ok', '- db: ok\n- cache: ok'), [('append', 1, 'b4')]),
+    (TEXT.replace('- api: ok\n', ''), [('delete', 'b3')]),
+    # type change can't be updated
+    (TEXT.replace('- db: ok', '1. db: ok'), [('delete', 'b4'), ('append', 1, 'b3')]),
+    # table rows are children, the table is recreated
+    (TEXT.replace('| a | 1 |', '| a | 2 |'), [('delete', 'b6'), ('append', 1, 'b5')]),
+    (TEXT.replace('!!todo\n', '!!todo checked=true\n'), [('update', 'b10')]),
+    # insert before the first block, first block is updated and inserted again after it
+    ('# Status\n\n' + TEXT, [('update', 'b1'), ('append', 2, 'b1')]),
+    # heading can't become a paragraph, the blank line under it does, the heading is deleted and inserted again
+    ('new line\n\n' + TEXT, [('delete', 'b1'), ('update', 'b2'), ('append', 3, 'b2')]),
+    # no block can become a divider, all blocks are recreated
+    ('---\n' + TEXT, None),
+    ('', None),
+])
+def test_sync_markdown(text, calls):
+    page = FakePage()
+    page.append_block_children('page', children=NP.md(TEXT))
+    page.calls.clear()
+    counts = sync_markdown(page, 'page', text)
+    assert page.content() == expected(text)
+    if calls is not None:
+        assert page.calls == calls
+    assert counts['unchanged'] + counts['updated'] + counts['appended'] == len(NP.md(text))
+
+
+def test_sync_markdown_keeps_child_pages():
+    page = FakePage()
+    page.append_block_children('page', children=NP.md('a'))
+    page.children['page'].append({'id': 'sub', 'type': 'child_page', 'has_children': False, 'child_page': {'title': 'x'}})
+    page.calls.clear()
+    assert sync_markdown(page, 'page', 'b') == {'unchanged': 0, 'updated': 1, 'deleted': 0, 'appended': 0}
+    assert [i['type'] for i in page.children['page']] == ['paragraph', 'child_page']
+
+
+def test_sync_markdown_removed_fields():
+    page = FakePage()
+    page.append_block_children('page', children=NP.md('!!callout emoji=💡 color=red_background\nnote'))
+    sync_markdown(page, 'page', '!!callout color=red_background\nnote')
+    # icon can't be removed by update, the callout is recreated
+    assert page.content() == expected('!!callout color=red_background\nnote')
+    page.calls.clear()
+    assert sync_markdown(page, 'page', '!!callout\nnote')['updated'] == 1
+    assert page.content() == expected('!!callout\nnote')
+    # in sync, nothing is sent again
+    page.calls.clear()
+    sync_markdown(page, 'page', '!!callout\nnote')
+    assert page.calls == []